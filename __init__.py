@@ -3,10 +3,18 @@ Super Arbitrage - A platform for finding and managing online arbitrage opportuni
 """
 from flask import Flask
 from flask_cors import CORS
-from config import config
-from .extensions import (
-    db, login_manager, limiter, mail, cache, assets, csrf
-)
+from jinja2 import FileSystemBytecodeCache
+from config import config_by_name
+from . import extensions
+from .extensions import db, login_manager, cache
+from .models import User, Product, Marketplace, ArbitrageOpportunity
+from .auth import auth as auth_blueprint
+from .main import main as main_blueprint
+from .api import api as api_blueprint
+from .admin import admin as admin_blueprint
+from .errors import not_found_error, internal_error, forbidden_error, ratelimit_error
+from .commands import register_commands
+from .utils import ORJSONProvider
 login_manager.login_message_category = 'info'
 
 def create_app(config_name='default'):
@@ -20,19 +28,24 @@ def create_app(config_name='default'):
         Flask: The configured Flask application instance.
     """
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
     
     # Apply configuration
-    app.config.from_object(config[config_name])
-    config[config_name].init_app(app)
+    app.config.from_object(config_by_name[config_name])
+    config_by_name[config_name].init_app(app)
+    
+    # Reuse compiled templates across worker restarts (per-user temp dir).
+    # auto_reload already follows app.debug, so production skips mtime checks.
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
     
     # Initialize extensions
     db.init_app(app)
     login_manager.init_app(app)
-    limiter.init_app(app)
-    mail.init_app(app)
+    extensions.limiter.init_app(app)
+    extensions.mail.init_app(app)
     cache.init_app(app)
-    assets.init_app(app)
-    csrf.init_app(app)
+    extensions.assets.init_app(app)
+    extensions.csrf.init_app(app)
     CORS(app)
     
     # Configure logging
@@ -64,18 +77,12 @@ def create_app(config_name='default'):
         app.logger.info('Super Arbitrage startup')
     
     # Register blueprints
-    from .auth import auth as auth_blueprint
-    from .main import main as main_blueprint
-    from .api import api as api_blueprint
-    from .admin import admin as admin_blueprint
-    
     app.register_blueprint(auth_blueprint, url_prefix='/auth')
     app.register_blueprint(main_blueprint)
     app.register_blueprint(api_blueprint, url_prefix='/api/v1')
     app.register_blueprint(admin_blueprint, url_prefix='/admin')
     
     # Error handlers
-    from .errors import not_found_error, internal_error, forbidden_error, ratelimit_error
     app.register_error_handler(404, not_found_error)
     app.register_error_handler(500, internal_error)
     app.register_error_handler(403, forbidden_error)
@@ -93,11 +100,8 @@ def create_app(config_name='default'):
         }
     
     # CLI commands
-    from .commands import register_commands
     register_commands(app)
     
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # Tables are created by `flask init-db`, not on every worker boot
     
     return app
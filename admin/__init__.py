@@ -1,17 +1,29 @@
 """Admin interface for the Super Arbitrage application."""
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_required, current_user
-from ..models import db, User, Role, Marketplace, Product, ArbitrageOpportunity, Notification
+from ..models import (db, User, Role, Marketplace, Product, ProductPriceHistory,
+                      ArbitrageOpportunity, Notification)
 from ..forms import ImportProductsForm, MarketplaceCredentialsForm, APIKeyForm
-from ..utils import admin_required, log_activity
-from werkzeug.utils import secure_filename
+from ..utils import admin_required, log_activity, paginate_keyset, list_loader_options, call_after_commit
+from ..extensions import cache
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, selectinload, object_session
 import os
+import io
 import csv
+import platform
+import threading
+import psutil
+from collections import deque
+from itertools import islice
 from datetime import datetime
 
 # Create admin blueprint
 admin = Blueprint('admin', __name__)
 
+# Rows written per flush when importing products from CSV
+IMPORT_BATCH_SIZE = 1000
+
 @admin.before_request
 @login_required
 @admin_required
@@ -19,19 +31,54 @@ def before_request():
     """Protect all admin endpoints."""
     pass
 
+@cache.memoize(timeout=30)
+def _dashboard_stats():
+    """Site-wide counters for the admin dashboard."""
+    # Fetch all counters in a single round trip using scalar subqueries.
+    # User.is_active is Flask-Login's property, not a column; filter on active
+    row = db.session.execute(db.select(
+        db.select(db.func.count(User.id)).scalar_subquery(),
+        db.select(db.func.count(User.id)).where(User.active.is_(True)).scalar_subquery(),
+        db.select(db.func.count(Product.id)).scalar_subquery(),
+        db.select(db.func.count(ArbitrageOpportunity.id)).scalar_subquery(),
+        db.select(db.func.count(Marketplace.id)).filter_by(is_active=True).scalar_subquery()
+    )).one()
+    
+    return {
+        'total_users': row[0],
+        'active_users': row[1],
+        'total_products': row[2],
+        'total_opportunities': row[3],
+        'active_marketplaces': row[4]
+    }
+
+def invalidate_dashboard_stats(session=None):
+    """Drop the cached dashboard counters once the session's transaction commits."""
+    call_after_commit(session or db.session(), lambda: cache.delete_memoized(_dashboard_stats))
+
+def _invalidate_dashboard_stats(mapper, connection, target):
+    # Flush time is too early: the row is not visible to other requests yet
+    invalidate_dashboard_stats(object_session(target))
+
+for _model in (User, Product, ArbitrageOpportunity):
+    event.listen(_model, 'after_insert', _invalidate_dashboard_stats)
+    event.listen(_model, 'after_delete', _invalidate_dashboard_stats)
+
 @admin.route('/')
 def index():
     """Admin dashboard."""
-    stats = {
-        'total_users': User.query.count(),
-        'active_users': User.query.filter_by(is_active=True).count(),
-        'total_products': Product.query.count(),
-        'total_opportunities': ArbitrageOpportunity.query.count(),
-        'active_marketplaces': Marketplace.query.filter_by(is_active=True).count()
-    }
+    stats = _dashboard_stats()
     
-    recent_users = User.query.order_by(User.created_at.desc()).limit(5).all()
+    recent_users = (User.query
+                   .options(selectinload(User.roles))
+                   .order_by(User.created_at.desc())
+                   .limit(5)
+                   .all())
     recent_opportunities = (ArbitrageOpportunity.query
+                          .options(*list_loader_options(
+                              joinedload(ArbitrageOpportunity.product),
+                              joinedload(ArbitrageOpportunity.source_marketplace),
+                              joinedload(ArbitrageOpportunity.target_marketplace)))
                           .order_by(ArbitrageOpportunity.created_at.desc())
                           .limit(5)
                           .all())
@@ -41,38 +88,51 @@ def index():
                          recent_users=recent_users,
                          recent_opportunities=recent_opportunities)
 
-@admin.route('/users')
-def users():
-    """List all users."""
-    page = request.args.get('page', 1, type=int)
-    per_page = current_app.config['ITEMS_PER_PAGE']
-    
+def _filtered_users_query(status=None, role_name=None, search=None):
+    """Build the user listing query for the given filters."""
     query = User.query
     
-    # Apply filters
-    if 'status' in request.args and request.args['status'] != 'all':
-        query = query.filter_by(is_active=(request.args['status'] == 'active'))
+    if status and status != 'all':
+        query = query.filter_by(is_active=(status == 'active'))
     
-    if 'role' in request.args and request.args['role'] != 'all':
-        role = Role.query.filter_by(name=request.args['role']).first()
+    if role_name and role_name != 'all':
+        role = Role.query.filter_by(name=role_name).first()
         if role:
             query = query.filter(User.roles.any(id=role.id))
     
-    if 'search' in request.args:
-        search = f"%{request.args['search']}%"
+    if search is not None:
+        search = f"%{search}%"
         query = query.filter(
             (User.username.ilike(search)) |
             (User.email.ilike(search))
         )
     
-    # Order and paginate
-    users = query.order_by(User.created_at.desc())\
-                .paginate(page=page, per_page=per_page, error_out=False)
+    return query
+
+@cache.memoize(timeout=60)
+def _count_users(status=None, role_name=None, search=None):
+    """Count users matching the listing filters, cached to keep paging cheap."""
+    return _filtered_users_query(status, role_name, search).count()
+
+@admin.route('/users')
+def users():
+    """List all users."""
+    cursor = request.args.get('cursor')
+    per_page = current_app.config['ITEMS_PER_PAGE']
+    filters = (request.args.get('status'), request.args.get('role'), request.args.get('search'))
+    
+    query = _filtered_users_query(*filters).options(selectinload(User.roles))
+    
+    # Seek past the cursor instead of counting and offsetting
+    users = paginate_keyset(query, User.created_at, User.id,
+                            cursor=cursor, per_page=per_page)
+    total_users = _count_users(*filters)
     
     roles = Role.query.all()
     
     return render_template('admin/users.html',
                          users=users,
+                         total_users=total_users,
                          roles=roles)
 
 @admin.route('/user/<int:user_id>')
@@ -81,19 +141,21 @@ def view_user(user_id):
     user = User.query.get_or_404(user_id)
     
     # Get user statistics
+    product_count = (db.select(db.func.count(Product.id))
+                     .filter_by(owner_id=user.id)
+                     .scalar_subquery())
+    opportunities, active_opportunities, total_profit, products = db.session.query(
+        db.func.count(ArbitrageOpportunity.id),
+        db.func.count(db.case((ArbitrageOpportunity.status == 'active', ArbitrageOpportunity.id))),
+        db.func.sum(db.case((ArbitrageOpportunity.status == 'completed', ArbitrageOpportunity.profit))),
+        product_count
+    ).filter(ArbitrageOpportunity.user_id == user.id).one()
+    
     stats = {
-        'products': Product.query.filter_by(owner_id=user.id).count(),
-        'opportunities': ArbitrageOpportunity.query.filter_by(user_id=user.id).count(),
-        'active_opportunities': ArbitrageOpportunity.query.filter_by(
-            user_id=user.id,
-            status='active'
-        ).count(),
-        'total_profit': db.session.query(
-            db.func.sum(ArbitrageOpportunity.profit)
-        ).filter(
-            ArbitrageOpportunity.user_id == user.id,
-            ArbitrageOpportunity.status == 'completed'
-        ).scalar() or 0
+        'products': products,
+        'opportunities': opportunities,
+        'active_opportunities': active_opportunities,
+        'total_profit': total_profit or 0
     }
     
     # Get recent activity
@@ -122,19 +184,21 @@ def view_marketplace(marketplace_id):
     
     # Get marketplace statistics
     stats = {
-        'products': Product.query.join(Product.prices)\
-                               .filter_by(marketplace_id=marketplace_id)\
-                               .distinct()\
-                               .count(),
+        'products': db.session.query(
+            db.func.count(db.distinct(ProductPriceHistory.product_id))
+        ).filter(ProductPriceHistory.marketplace_id == marketplace_id).scalar(),
         'opportunities': ArbitrageOpportunity.query.filter(
             (ArbitrageOpportunity.source_marketplace_id == marketplace_id) |
             (ArbitrageOpportunity.target_marketplace_id == marketplace_id)
         ).count(),
-        'active_users': User.query.join(User.products)\
-                                .join(Product.prices)\
-                                .filter_by(marketplace_id=marketplace_id)\
-                                .distinct()\
-                                .count()
+        # EXISTS lets the planner use a semi-join instead of de-duplicating joined rows
+        'active_users': db.session.query(db.func.count(User.id)).filter(
+            db.exists().where(
+                Product.owner_id == User.id,
+                ProductPriceHistory.product_id == Product.id,
+                ProductPriceHistory.marketplace_id == marketplace_id
+            )
+        ).scalar()
     }
     
     # Get recent activity
@@ -149,6 +213,21 @@ def view_marketplace(marketplace_id):
                          stats=stats,
                          recent_products=recent_products)
 
+def _batched(iterable, size):
+    """Yield lists of up to ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def _csv_cell(values, index):
+    """Return the CSV cell at ``index``, or None if the column is absent."""
+    if index is None or index >= len(values):
+        return None
+    return values[index]
+
 @admin.route('/import-products', methods=['GET', 'POST'])
 def import_products():
     """Import products from CSV."""
@@ -165,57 +244,98 @@ def import_products():
             flash('Please upload a CSV file.', 'danger')
             return redirect(url_for('admin.import_products'))
         
-        # Save the uploaded file
-        filename = secure_filename(file.filename)
-        upload_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'imports')
-        os.makedirs(upload_dir, exist_ok=True)
-        filepath = os.path.join(upload_dir, f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}_{filename}")
-        file.save(filepath)
-        
-        # Process the CSV file
+        # Process the CSV file straight from the upload stream
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
+            with io.TextIOWrapper(file.stream, encoding='utf-8', newline='') as f:
+                reader = csv.reader(f)
+                header = next(reader, [])
                 required_fields = ['name', 'price', 'url']
                 
                 # Check for required fields
-                if not all(field in reader.fieldnames for field in required_fields):
+                if not all(field in header for field in required_fields):
                     flash('CSV file is missing required fields.', 'danger')
                     return redirect(url_for('admin.import_products'))
                 
-                # Process each row
+                columns = {field: index for index, field in enumerate(header)}
+                name_col, price_col, url_col = (columns[f] for f in required_fields)
+                id_col = columns.get('id')
+                image_col = columns.get('image_url')
+                category_col = columns.get('category')
+                brand_col = columns.get('brand')
+                
                 imported = 0
                 updated = 0
-                for row in reader:
-                    # Check if product already exists
-                    product = Product.query.filter_by(
-                        marketplace_id=marketplace.id,
-                        external_id=row.get('id', '')
-                    ).first()
+                now = datetime.utcnow()
+                rows = (values for values in reader if values)
+                
+                # Write in fixed-size batches so memory and statement size stay bounded
+                for batch in _batched(rows, IMPORT_BATCH_SIZE):
+                    # Look up the batch's existing products in one query instead of one per row
+                    external_ids = {_csv_cell(values, id_col) or '' for values in batch}
+                    existing = dict(
+                        db.session.query(Product.external_id, Product.id)
+                        .filter(Product.marketplace_id == marketplace.id,
+                                Product.external_id.in_(external_ids))
+                        .all()
+                    )
+                    
+                    # Partition rows into inserts and updates; prices go to the price history
+                    insert_rows = {}
+                    insert_prices = {}
+                    update_rows = []
+                    price_rows = []
+                    for values in batch:
+                        external_id = _csv_cell(values, id_col)
+                        key = external_id or ''
+                        fields = {
+                            'name': values[name_col],
+                            'url': values[url_col]
+                        }
+                        price = float(values[price_col])
+                        
+                        if key in existing:
+                            if form.update_existing.data:
+                                fields.update(id=existing[key], updated_at=now)
+                                update_rows.append(fields)
+                                price_rows.append({'product_id': existing[key], 'price': price})
+                        elif key in insert_rows:
+                            # Repeated row for a product created earlier in this batch
+                            if form.update_existing.data:
+                                insert_rows[key].update(fields)
+                                insert_prices[key] = price
+                        else:
+                            fields.update(
+                                marketplace_id=marketplace.id,
+                                external_id=external_id,
+                                image_url=_csv_cell(values, image_col),
+                                category=_csv_cell(values, category_col),
+                                brand=_csv_cell(values, brand_col)
+                            )
+                            insert_rows[key] = fields
+                            insert_prices[key] = price
                     
-                    if product and form.update_existing.data:
-                        # Update existing product
-                        product.name = row['name']
-                        product.price = float(row['price'])
-                        product.url = row['url']
-                        product.updated_at = datetime.utcnow()
-                        updated += 1
-                    elif not product:
-                        # Create new product
-                        product = Product(
-                            name=row['name'],
-                            price=float(row['price']),
-                            url=row['url'],
-                            marketplace_id=marketplace.id,
-                            external_id=row.get('id'),
-                            image_url=row.get('image_url'),
-                            category=row.get('category'),
-                            brand=row.get('brand')
-                        )
-                        db.session.add(product)
-                        imported += 1
+                    if insert_rows:
+                        # One multi-row INSERT; RETURNING hands back the IDs in row order
+                        new_ids = db.session.scalars(
+                            db.insert(Product).returning(Product.id, sort_by_parameter_order=True),
+                            list(insert_rows.values())
+                        ).all()
+                        price_rows.extend({'product_id': product_id, 'price': insert_prices[key]}
+                                          for key, product_id in zip(insert_rows, new_ids))
+                    if update_rows:
+                        db.session.execute(db.update(Product), update_rows)
+                    if price_rows:
+                        for row in price_rows:
+                            row.update(marketplace_id=marketplace.id, timestamp=now)
+                        db.session.execute(db.insert(ProductPriceHistory), price_rows)
+                    db.session.flush()
+                    db.session.expunge_all()
+                    imported += len(insert_rows)
+                    updated += len(update_rows)
                 
                 db.session.commit()
+                # Bulk writes bypass mapper events, so invalidate explicitly
+                cache.delete_memoized(_dashboard_stats)
                 
                 flash(f'Successfully imported {imported} products and updated {updated} products.', 'success')
                 log_activity('import_products', f'Imported {imported} products from {marketplace.name}')
@@ -225,7 +345,7 @@ def import_products():
             current_app.logger.error(f'Error importing products: {str(e)}')
             flash('An error occurred while importing products. Please check the file format and try again.', 'danger')
         
-        return redirect(url_for('admin.products'))
+        return redirect(url_for('admin.view_marketplace', marketplace_id=marketplace.id))
     
     return render_template('admin/import_products.html', form=form)
 
@@ -297,8 +417,8 @@ def api_keys():
         # Show the API key to the user (only once)
         return render_template('admin/api_key_generated.html', api_key=api_key)
     
-    # List existing API keys
-    api_keys = current_user.api_keys.order_by(APIKey.created_at.desc()).all()
+    # List existing API keys (the relationship is already ordered newest first)
+    api_keys = current_user.api_keys
     
     return render_template('admin/api_keys.html',
                          form=form,
@@ -330,31 +450,56 @@ def system_logs():
     log_file = os.path.join(current_app.instance_path, 'logs', 'superarbitrage.log')
     
     try:
+        # Stream the file, keeping only the last 1000 non-blank lines in memory
         with open(log_file, 'r') as f:
-            logs = f.read().split('\n')
-        logs = [log for log in logs if log.strip()][-1000:]  # Show last 1000 lines
+            logs = list(deque((line.rstrip('\n') for line in f if line.strip()), maxlen=1000))
     except FileNotFoundError:
         logs = ["No log file found."]
     
     return render_template('admin/system_logs.html', logs=logs)
 
-@admin.route('/system/status')
-def system_status():
-    """View system status."""
-    import psutil
-    import platform
-    from datetime import datetime
-    
-    # System information
-    system_info = {
+_cpu_usage = 0.0
+_cpu_sampler_lock = threading.Lock()
+# Threads don't survive a fork (e.g. gunicorn --preload), so remember which
+# process the sampler runs in rather than just whether it was started
+_cpu_sampler_pid = None
+
+def _sample_cpu_usage():
+    """Keep ``_cpu_usage`` updated with a one-second CPU sample."""
+    global _cpu_usage
+    while True:
+        _cpu_usage = psutil.cpu_percent(interval=1.0)
+
+def start_cpu_sampler():
+    """Start the background CPU sampler thread once per process."""
+    global _cpu_sampler_pid
+    with _cpu_sampler_lock:
+        if _cpu_sampler_pid == os.getpid():
+            return
+        threading.Thread(target=_sample_cpu_usage, name='cpu-sampler', daemon=True).start()
+        _cpu_sampler_pid = os.getpid()
+
+@cache.memoize(timeout=5)
+def _system_info():
+    """Host and process metrics shown on the status page."""
+    # Started on first use, in the worker that serves the page; CPU reads
+    # 0.0 until the first one-second sample completes
+    start_cpu_sampler()
+    return {
         'platform': platform.platform(),
         'python_version': platform.python_version(),
-        'cpu_usage': psutil.cpu_percent(),
+        'cpu_usage': _cpu_usage,
         'memory_usage': psutil.virtual_memory().percent,
         'disk_usage': psutil.disk_usage('/').percent,
         'uptime': str(datetime.now() - datetime.fromtimestamp(psutil.boot_time())),
         'process_uptime': str(datetime.now() - datetime.fromtimestamp(psutil.Process().create_time()))
     }
+
+@admin.route('/system/status')
+def system_status():
+    """View system status."""
+    # System information
+    system_info = _system_info()
     
     # Database status
     try:
@@ -3,7 +3,8 @@ from flask import Blueprint, jsonify, request, current_app
 from flask_login import current_user, login_required
 from functools import wraps
 from ..models import db, User, Product, ArbitrageOpportunity, Marketplace, Notification
-from ..utils import admin_required, log_activity
+from ..utils import admin_required, log_activity, paginate_keyset, list_loader_options
+from sqlalchemy.orm import joinedload, selectinload, load_only, defer
 from datetime import datetime, timedelta
 import json
 
@@ -23,12 +24,33 @@ def api_login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def cursor_paginated(f):
+    """Decorator for list endpoints that page with ``?cursor=``.
+    
+    Offset pagination (``?page=``) was removed in API 1.1.0. ``page=1`` is
+    still the first page; later pages have no cursor equivalent, so they get
+    a 400 explaining the switch instead of silently repeating page one.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        page = request.args.get('page', type=int)
+        if page is not None and page > 1:
+            return jsonify({
+                'status': 'error',
+                'message': ('Offset pagination (?page=) is no longer supported. Request the '
+                            'first page without it, then pass data.next_cursor as ?cursor= '
+                            'while data.has_next is true.'),
+                'code': 400
+            }), 400
+        return f(*args, **kwargs)
+    return decorated_function
+
 @api.route('/status')
 def status():
     """API status endpoint."""
     return jsonify({
         'status': 'ok',
-        'version': '1.0.0',
+        'version': '1.1.0',
         'timestamp': datetime.utcnow().isoformat()
     })
 
@@ -48,12 +70,18 @@ def auth_status():
 
 @api.route('/products', methods=['GET'])
 @api_login_required
+@cursor_paginated
 def get_products():
     """Get a list of products."""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = min(request.args.get('per_page', 10, type=int), 100)
     
-    query = Product.query.filter_by(owner_id=current_user.id)
+    # Only load the columns Product.to_dict() serializes
+    query = Product.query.options(*list_loader_options(
+        load_only(Product.id, Product.name, Product.upc, Product.brand, Product.category,
+                  Product.image_url, Product.created_at, Product.updated_at),
+        selectinload(Product.latest_price)
+    )).filter_by(owner_id=current_user.id)
     
     # Apply filters
     if 'search' in request.args:
@@ -64,18 +92,17 @@ def get_products():
         query = query.join(ProductPriceHistory)\
                     .filter(ProductPriceHistory.marketplace_id == request.args['marketplace_id'])
     
-    # Order and paginate
-    products = query.order_by(Product.created_at.desc())\
-                   .paginate(page=page, per_page=per_page, error_out=False)
+    # Seek past the cursor instead of counting and offsetting
+    products = paginate_keyset(query, Product.created_at, Product.id,
+                               cursor=cursor, per_page=per_page)
     
     return jsonify({
         'status': 'success',
         'data': {
             'items': [p.to_dict() for p in products.items],
-            'page': products.page,
             'per_page': products.per_page,
-            'total': products.total,
-            'pages': products.pages
+            'has_next': products.has_next,
+            'next_cursor': products.next_cursor
         }
     })
 
@@ -100,12 +127,18 @@ def get_product(product_id):
 
 @api.route('/opportunities', methods=['GET'])
 @api_login_required
+@cursor_paginated
 def get_opportunities():
     """Get a list of arbitrage opportunities."""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = min(request.args.get('per_page', 10, type=int), 50)
     
-    query = ArbitrageOpportunity.query.filter_by(user_id=current_user.id)
+    query = ArbitrageOpportunity.query.options(*list_loader_options(
+        defer(ArbitrageOpportunity.notes),
+        joinedload(ArbitrageOpportunity.product),
+        joinedload(ArbitrageOpportunity.source_marketplace),
+        joinedload(ArbitrageOpportunity.target_marketplace)
+    )).filter_by(user_id=current_user.id)
     
     # Apply filters
     if 'status' in request.args and request.args['status'] != 'all':
@@ -123,18 +156,17 @@ def get_opportunities():
     if 'target_marketplace_id' in request.args:
         query = query.filter_by(target_marketplace_id=request.args['target_marketplace_id'])
     
-    # Order and paginate
-    opportunities = query.order_by(ArbitrageOpportunity.created_at.desc())\
-                       .paginate(page=page, per_page=per_page, error_out=False)
+    # Seek past the cursor instead of counting and offsetting
+    opportunities = paginate_keyset(query, ArbitrageOpportunity.created_at, ArbitrageOpportunity.id,
+                                    cursor=cursor, per_page=per_page)
     
     return jsonify({
         'status': 'success',
         'data': {
             'items': [o.to_dict() for o in opportunities.items],
-            'page': opportunities.page,
             'per_page': opportunities.per_page,
-            'total': opportunities.total,
-            'pages': opportunities.pages
+            'has_next': opportunities.has_next,
+            'next_cursor': opportunities.next_cursor
         }
     })
 
@@ -150,28 +182,28 @@ def get_marketplaces():
 
 @api.route('/notifications', methods=['GET'])
 @api_login_required
+@cursor_paginated
 def get_notifications():
     """Get user notifications."""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = min(request.args.get('per_page', 10, type=int), 50)
     status = request.args.get('status', 'unread')
     
-    query = Notification.query.filter_by(user_id=current_user.id)
+    query = Notification.query.options(*list_loader_options()).filter_by(user_id=current_user.id)
     
     if status != 'all':
         query = query.filter_by(status=status)
     
-    notifications = query.order_by(Notification.created_at.desc())\
-                       .paginate(page=page, per_page=per_page, error_out=False)
+    notifications = paginate_keyset(query, Notification.created_at, Notification.id,
+                                    cursor=cursor, per_page=per_page)
     
     return jsonify({
         'status': 'success',
         'data': {
             'items': [n.to_dict() for n in notifications.items],
-            'page': notifications.page,
             'per_page': notifications.per_page,
-            'total': notifications.total,
-            'pages': notifications.pages
+            'has_next': notifications.has_next,
+            'next_cursor': notifications.next_cursor
         }
     })
 
@@ -185,7 +217,7 @@ def mark_all_notifications_read():
     ).update({
         'status': 'read',
         'read_at': datetime.utcnow()
-    })
+    }, synchronize_session=False)
     
     db.session.commit()
     
@@ -210,6 +242,7 @@ def mark_notification_read(notification_id):
         }), 403
     
     notification.mark_as_read()
+    db.session.commit()
     
     return jsonify({
         'status': 'success',
@@ -4,7 +4,10 @@ Super Arbitrage Web Interface
 A Flask-based web application for the Super Arbitrage platform.
 """
 import os
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+import re
+from flask import Flask, render_template, request, jsonify, redirect, url_for, flash, send_file, abort
+from flask.sessions import SecureCookieSessionInterface
+from flask_caching import Cache
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
@@ -12,13 +15,25 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
-import json
+import orjson
+import hashlib
+import heapq
+import hmac
+import ijson
+import sqlite3
+import threading
+import time
+import uuid
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count, islice
 from pathlib import Path
 import logging
 from logging.handlers import RotatingFileHandler
 
 # Import configuration
 from config import config
+from .utils import ORJSONProvider
 
 # Import our arbitrage engine
 from src.arbitrage_engine import ArbitrageEngine, ArbitrageOpportunity
@@ -32,12 +47,32 @@ limiter = Limiter(
     default_limits=["200 per day", "50 per hour"]
 )
 
+class StaticRequestFilteringSessionInterface(SecureCookieSessionInterface):
+    """Session interface that never writes the cookie for raw file responses.
+    
+    The session is still read so ``login_required`` works, but serving a
+    cached JSON file should not emit a fresh Set-Cookie header.
+    """
+    
+    _exclude_path_prefix = '/opportunity/'
+    _exclude_path_suffix = '/raw'
+    
+    def _is_excluded(self, path):
+        return path.startswith(self._exclude_path_prefix) and path.endswith(self._exclude_path_suffix)
+    
+    def save_session(self, app, session, response):
+        if self._is_excluded(request.path):
+            return
+        return super().save_session(app, session, response)
+
 def create_app(config_name=None):
     """Application factory function."""
     if config_name is None:
         config_name = os.getenv('FLASK_ENV', 'development')
     
     app = Flask(__name__)
+    app.json = ORJSONProvider(app)
+    app.session_interface = StaticRequestFilteringSessionInterface()
     
     # Apply configuration
     app.config.from_object(f'config.{config_name.capitalize()}Config')
@@ -83,16 +118,50 @@ login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 
+# Cache for file-backed views
+cache = Cache(app, config={'CACHE_TYPE': 'SimpleCache'})
+
 # Configuration
 DATA_DIR = Path('data')
 DATA_DIR.mkdir(exist_ok=True)
 USERS_FILE = DATA_DIR / 'users.json'
 
-# Initialize arbitrage engine
-arbitrage_engine = ArbitrageEngine(data_dir=DATA_DIR)
+# Explicit KDF cost; override with a cheaper method (e.g. scrypt:1024:8:1) in CI
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+
+# Append-only index of saved opportunity files, one JSON line per file
+MANIFEST_FILE = DATA_DIR / 'opportunities' / '_index.jsonl'
+MANIFEST_READ_BLOCK = 8192
+_MANIFEST_LOCK = threading.RLock()
+
+# Only names written by the find task may be opened from a URL
+_FILENAME_RE = re.compile(r'^opportunities_\d{8}_\d{6}\.json$')
+
+# Error IDs: a per-process random prefix plus a counter
+_ERR_PREFIX = uuid.uuid4().hex[:8]
+_ERR_COUNTER = count()
+
+# Arbitrage engine, created on first use: its scrapers each start a Chrome
+# WebDriver, which workers that only serve listing pages never need
+_arbitrage_engine = None
+_arbitrage_engine_lock = threading.Lock()
+
+def get_arbitrage_engine():
+    global _arbitrage_engine
+    if _arbitrage_engine is None:
+        with _arbitrage_engine_lock:
+            if _arbitrage_engine is None:
+                _arbitrage_engine = ArbitrageEngine(data_dir=DATA_DIR)
+    return _arbitrage_engine
+
+# Scans run on a small thread pool; recent jobs are kept for status polling
+MAX_FIND_JOBS = 256
+_find_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='find')
 
 # User class for authentication
 class User:
+    __slots__ = ('username', 'password_hash', 'is_authenticated', 'is_active', 'is_anonymous')
+    
     def __init__(self, username, password_hash):
         self.username = username
         self.password_hash = password_hash
@@ -104,30 +173,119 @@ class User:
         return self.username
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return _verify(self.password_hash, password)
+
+# Recent verification results. Keys hold a per-process HMAC of the password,
+# never the plaintext, and entries expire a minute after they were computed.
+_VERIFY_CACHE = TTLCache(maxsize=4096, ttl=60)
+_VERIFY_CACHE_LOCK = threading.Lock()
+_VERIFY_KEY = os.urandom(32)
+
+def _verify(hash_str, password):
+    """Check a password, reusing the result for the same pair within a minute."""
+    if not hash_str or password is None:
+        return False
+    digest = hmac.new(_VERIFY_KEY, password.encode('utf-8'), hashlib.sha256).digest()
+    key = (hash_str, digest)
+    with _VERIFY_CACHE_LOCK:
+        result = _VERIFY_CACHE.get(key)
+    if result is None:
+        result = check_password_hash(hash_str, password)
+        with _VERIFY_CACHE_LOCK:
+            _VERIFY_CACHE[key] = result
+    return result
+
+# User store: SQLite in WAL mode so readers never block on a registration
+USERS_DB = DATA_DIR / 'users.db'
+_DB = sqlite3.connect(str(USERS_DB), check_same_thread=False, isolation_level=None)
+_DB.execute('PRAGMA journal_mode=WAL')
+_DB.execute('PRAGMA synchronous=NORMAL')
+_DB.execute(
+    'CREATE TABLE IF NOT EXISTS users('
+    'username TEXT PRIMARY KEY, password_hash TEXT NOT NULL)'
+)
+_DB_LOCK = threading.Lock()
+
+# Scan jobs live in the shared store rather than process memory: under
+# several gunicorn workers the status poll rarely reaches the worker that
+# ran the scan. The scan itself still runs in the submitting worker.
+_DB.execute(
+    'CREATE TABLE IF NOT EXISTS find_jobs('
+    'job_id TEXT PRIMARY KEY, owner TEXT NOT NULL, status TEXT NOT NULL, '
+    'result BLOB, created_at REAL NOT NULL)'
+)
+
+# Recently loaded users, so the user loader doesn't hit the store on every request
+_USER_CACHE = TTLCache(maxsize=1024, ttl=30)
+_USER_CACHE_LOCK = threading.Lock()
 
-# Load users from JSON file
-def load_users():
+def _migrate_users_file():
+    """Import the legacy users.json once, if the table is still empty."""
     if not USERS_FILE.exists():
-        return {}
-    with open(USERS_FILE, 'r') as f:
-        return json.load(f)
+        return
+    with _DB_LOCK:
+        if _DB.execute('SELECT 1 FROM users LIMIT 1').fetchone():
+            return
+        with open(USERS_FILE, 'rb') as f:
+            users = orjson.loads(f.read())
+        _DB.executemany(
+            'INSERT OR IGNORE INTO users(username, password_hash) VALUES (?, ?)',
+            users.items()
+        )
+
+_migrate_users_file()
+
+def get_password_hash(username):
+    with _DB_LOCK:
+        row = _DB.execute(
+            'SELECT password_hash FROM users WHERE username = ?', (username,)
+        ).fetchone()
+    return row[0] if row else None
 
 def save_user(username, password):
-    users = load_users()
-    users[username] = generate_password_hash(password)
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f)
+    # Nothing to do if the stored hash already matches this password
+    existing = get_password_hash(username)
+    if existing is not None and _verify(existing, password):
+        return
+    
+    password_hash = generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+    with _DB_LOCK:
+        _DB.execute(
+            'INSERT OR REPLACE INTO users(username, password_hash) VALUES (?, ?)',
+            (username, password_hash)
+        )
+    # Drop cached state that may reference the old hash
+    with _VERIFY_CACHE_LOCK:
+        _VERIFY_CACHE.clear()
+    with _USER_CACHE_LOCK:
+        _USER_CACHE.pop(username, None)
 
-@login_manager.user_loader
-def load_user(username):
-    users = load_users()
-    if username not in users:
+def _get_user(username):
+    with _USER_CACHE_LOCK:
+        user = _USER_CACHE.get(username)
+    if user is not None:
+        return user
+    
+    password_hash = get_password_hash(username)
+    if password_hash is None:
         return None
-    user = User(username, users[username])
+    user = User(username, password_hash)
     user.is_authenticated = True
+    with _USER_CACHE_LOCK:
+        _USER_CACHE[username] = user
     return user
 
+def _authenticate(username, password):
+    """Return the authenticated User for valid credentials, else None."""
+    user = _get_user(username)
+    if user is None or not user.check_password(password):
+        return None
+    return user
+
+@login_manager.user_loader
+def load_user(username):
+    return _get_user(username)
+
 # Routes
 @app.route('/')
 def index():
@@ -141,10 +299,8 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
         
-        users = load_users()
-        if username in users and check_password_hash(users[username], password):
-            user = User(username, users[username])
-            user.is_authenticated = True
+        user = _authenticate(username, password)
+        if user is not None:
             login_user(user, remember=True)
             next_page = request.args.get('next')
             return redirect(next_page or url_for('dashboard'))
@@ -164,8 +320,7 @@ def register():
             flash('Passwords do not match', 'danger')
             return redirect(url_for('register'))
         
-        users = load_users()
-        if username in users:
+        if get_password_hash(username) is not None:
             flash('Username already exists', 'danger')
             return redirect(url_for('register'))
         
@@ -181,60 +336,194 @@ def logout():
     logout_user()
     return redirect(url_for('index'))
 
+def _sorted_opportunity_files(directory, limit=None):
+    """Saved opportunity files, newest first (only the newest ``limit`` if given).
+    
+    ``DirEntry.stat()`` reuses the readdir result where the OS allows, so
+    sorting by mtime does not cost an extra stat per file.
+    """
+    mtime = lambda e: e.stat().st_mtime
+    with os.scandir(directory) as it:
+        entries = (e for e in it if e.name.endswith('.json') and e.is_file())
+        if limit is not None:
+            return heapq.nlargest(limit, entries, key=mtime)
+        return sorted(entries, key=mtime, reverse=True)
+
+def _manifest_entry(filename, mtime, count, top3):
+    return orjson.dumps({
+        'filename': filename,
+        'mtime': mtime,
+        'count': count,
+        'top3': top3
+    }) + b'\n'
+
+def append_to_manifest(filename, opportunities):
+    """Record a newly saved opportunities file in the listing manifest."""
+    entry = _manifest_entry(filename, time.time(), len(opportunities),
+                            [opp.to_dict() for opp in opportunities[:3]])
+    with _MANIFEST_LOCK:
+        if not MANIFEST_FILE.exists():
+            # First save on a deployment with older files: index those first,
+            # or 'ab' would start a manifest that hides them for good
+            _rebuild_manifest(exclude=filename)
+        with open(MANIFEST_FILE, 'ab') as f:
+            f.write(entry)
+
+def _scan_manifest_entry(file):
+    with open(file, 'rb') as f:
+        try:
+            # Stream only the top 3 items instead of parsing the whole file
+            top3 = list(islice(ijson.items(f, 'item', use_float=True), 3))
+        except ijson.JSONError:
+            return None
+    return _manifest_entry(file.name, file.stat().st_mtime, None, top3)
+
+def _rebuild_manifest(exclude=None):
+    """Cold path: regenerate the manifest from the files on disk."""
+    lines = [_scan_manifest_entry(file)
+             for file in reversed(_sorted_opportunity_files(MANIFEST_FILE.parent))
+             if file.name != exclude]
+    lines = [line for line in lines if line is not None]
+    
+    with _MANIFEST_LOCK:
+        tmp = MANIFEST_FILE.with_suffix('.tmp')
+        with open(tmp, 'wb') as f:
+            f.writelines(lines)
+        os.replace(tmp, MANIFEST_FILE)
+
+def read_manifest(limit=None):
+    """Manifest entries, newest first; only the tail is read when ``limit`` is set."""
+    if not MANIFEST_FILE.exists():
+        if not MANIFEST_FILE.parent.exists():
+            return []
+        if limit is not None:
+            # Don't pay for a full rebuild just to show the newest few files
+            lines = (_scan_manifest_entry(file)
+                     for file in _sorted_opportunity_files(MANIFEST_FILE.parent, limit))
+            return [orjson.loads(line) for line in lines if line is not None]
+        _rebuild_manifest()
+    
+    with open(MANIFEST_FILE, 'rb') as f:
+        if limit is None:
+            data = f.read()
+        else:
+            # Read backwards in blocks until we have enough complete lines
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            data = b''
+            while pos > 0 and data.count(b'\n') <= limit:
+                step = min(MANIFEST_READ_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+            if pos > 0:
+                data = data.split(b'\n', 1)[1]
+    
+    lines = data.splitlines()
+    if limit is not None:
+        lines = lines[-limit:]
+    return [orjson.loads(line) for line in reversed(lines) if line]
+
+@cache.memoize(timeout=60)
+def _load_recent_opportunities(manifest_key):
+    """Top opportunities from the five newest files.
+
+    ``manifest_key`` (mtime and size) is only part of the cache key: every
+    append changes it, so a new search result is never served stale.
+    """
+    opportunities = []
+    for entry in read_manifest(limit=5):
+        opportunities.extend(entry['top3'])
+    return opportunities[:10]
+
 @app.route('/dashboard')
 @login_required
 def dashboard():
     # Load recent opportunities
-    opportunities_dir = DATA_DIR / 'opportunities'
     opportunities = []
     
-    if opportunities_dir.exists():
-        for file in sorted(opportunities_dir.glob('*.json'), key=os.path.getmtime, reverse=True)[:5]:
-            with open(file, 'r') as f:
-                try:
-                    data = json.load(f)
-                    if isinstance(data, list) and len(data) > 0:
-                        opportunities.extend(data[:3])  # Show top 3 from each file
-                except json.JSONDecodeError:
-                    continue
+    if MANIFEST_FILE.parent.exists():
+        try:
+            st = os.stat(MANIFEST_FILE)
+            manifest_key = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            manifest_key = None
+        opportunities = _load_recent_opportunities(manifest_key)
     
-    return render_template('dashboard.html', opportunities=opportunities[:10])
+    return render_template('dashboard.html', opportunities=opportunities)
+
+def _serialize_opportunity(opp):
+    # Numbers are sent raw and formatted by the client
+    return {
+        'title': opp.source_product.get('title', 'No title'),
+        'source_price': opp.source_product.get('price', 0),
+        'target_price': opp.target_price,
+        'profit': opp.profit,
+        'profit_margin': opp.profit_margin,
+        'source_url': opp.source_product.get('url', '#')
+    }
+
+def _find_opportunities_task(params, save):
+    """Run a scan off the request thread, optionally saving the results."""
+    arbitrage_engine = get_arbitrage_engine()
+    opportunities = arbitrage_engine.find_opportunities(**params)
+    if opportunities and save:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        (DATA_DIR / 'opportunities').mkdir(exist_ok=True, parents=True)
+        filename = f"opportunities_{timestamp}.json"
+        arbitrage_engine.save_opportunities(opportunities, f"opportunities/{filename}")
+        append_to_manifest(filename, opportunities)
+        with app.app_context():
+            cache.delete_memoized(_load_recent_opportunities)
+    return [_serialize_opportunity(opp) for opp in opportunities]
+
+def _record_find_result(job_id, future):
+    """Done-callback: store a finished scan's outcome for ``task_status``."""
+    error = future.exception()
+    if error is not None:
+        app.logger.error(f'Opportunity search {job_id} failed: {error}')
+        status, result = 'failed', None
+    else:
+        status, result = 'finished', orjson.dumps(future.result())
+    with _DB_LOCK:
+        _DB.execute('UPDATE find_jobs SET status = ?, result = ? WHERE job_id = ?',
+                    (status, result, job_id))
+
+def _submit_find_task(params, owner, save=False):
+    job_id = uuid.uuid4().hex
+    with _DB_LOCK:
+        _DB.execute(
+            "INSERT INTO find_jobs(job_id, owner, status, created_at) VALUES (?, ?, 'pending', ?)",
+            (job_id, owner, time.time())
+        )
+        _DB.execute(
+            'DELETE FROM find_jobs WHERE job_id NOT IN '
+            '(SELECT job_id FROM find_jobs ORDER BY created_at DESC LIMIT ?)',
+            (MAX_FIND_JOBS,)
+        )
+    future = _find_executor.submit(_find_opportunities_task, params, save)
+    future.add_done_callback(lambda f: _record_find_result(job_id, f))
+    return job_id
+
+def _find_params(args):
+    return {
+        'source_platform': args.get('source'),
+        'target_platform': args.get('target'),
+        'query': args.get('query'),
+        'min_profit': float(args.get('min_profit', 10.0)),
+        'min_margin': float(args.get('min_margin', 20.0)),
+        'max_results': int(args.get('max_results', 20))
+    }
 
 @app.route('/find', methods=['GET', 'POST'])
 @login_required
 def find():
     if request.method == 'POST':
-        source = request.form.get('source')
-        target = request.form.get('target')
-        query = request.form.get('query')
-        min_profit = float(request.form.get('min_profit', 10.0))
-        min_margin = float(request.form.get('min_margin', 20.0))
-        max_results = int(request.form.get('max_results', 20))
-        
-        # Run the arbitrage search
-        opportunities = arbitrage_engine.find_opportunities(
-            source_platform=source,
-            target_platform=target,
-            query=query,
-            min_profit=min_profit,
-            min_margin=min_margin,
-            max_results=max_results
-        )
-        
-        # Save the results
-        if opportunities:
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"opportunities_{timestamp}.json"
-            arbitrage_engine.save_opportunities(opportunities, filename)
-            flash(f'Found {len(opportunities)} opportunities!', 'success')
-        else:
-            flash('No opportunities found with the current criteria.', 'warning')
-        
-        return render_template('results.html', 
-                             opportunities=opportunities,
-                             source=source,
-                             target=target,
-                             query=query)
+        # Run the arbitrage search in the background; results are saved
+        # to the opportunities list when it finishes
+        _submit_find_task(_find_params(request.form), current_user.get_id(), save=True)
+        flash('Search started. New opportunities will appear here when it finishes.', 'info')
+        return redirect(url_for('opportunities'))
     
     return render_template('find.html')
 
@@ -242,68 +531,80 @@ def find():
 @login_required
 def opportunities():
     # List all saved opportunities
-    opportunities_dir = DATA_DIR / 'opportunities'
-    opportunity_files = []
-    
-    if opportunities_dir.exists():
-        opportunity_files = sorted(
-            opportunities_dir.glob('*.json'),
-            key=os.path.getmtime,
-            reverse=True
-        )
+    opportunity_files = read_manifest()
     
     return render_template('opportunities.html', opportunity_files=opportunity_files)
 
 @app.route('/opportunity/<filename>')
 @login_required
 def view_opportunity(filename):
-    filepath = DATA_DIR / 'opportunities' / filename
-    if not filepath.exists() or '..' in filename or not filepath.is_file():
+    try:
+        if not _FILENAME_RE.match(filename):
+            raise FileNotFoundError(filename)
+        with open(DATA_DIR / 'opportunities' / filename, 'rb') as f:
+            opportunities = orjson.loads(f.read())
+    except FileNotFoundError:
         flash('Opportunity not found', 'danger')
         return redirect(url_for('opportunities'))
     
-    with open(filepath, 'r') as f:
-        opportunities = json.load(f)
-    
     return render_template('view_opportunity.html', 
                          opportunities=opportunities,
                          filename=filename)
 
+@app.route('/opportunity/<filename>/raw')
+@login_required
+def view_opportunity_raw(filename):
+    """Serve the saved file as-is; conditional GETs get a 304 without parsing it."""
+    if not _FILENAME_RE.match(filename):
+        abort(404)
+    
+    try:
+        return send_file(DATA_DIR / 'opportunities' / filename,
+                         mimetype='application/json', conditional=True, max_age=60)
+    except FileNotFoundError:
+        abort(404)
+
 # API Endpoints
 @app.route('/api/opportunities', methods=['GET'])
 @login_required
 def api_opportunities():
-    source = request.args.get('source')
-    target = request.args.get('target')
-    query = request.args.get('query')
-    min_profit = float(request.args.get('min_profit', 10.0))
-    min_margin = float(request.args.get('min_margin', 20.0))
-    max_results = int(request.args.get('max_results', 20))
+    job_id = _submit_find_task(_find_params(request.args), current_user.get_id())
+    status_url = url_for('task_status', job_id=job_id)
+    
+    response = jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': 'pending',
+        'status_url': status_url
+    })
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    return response
+
+@app.route('/api/tasks/<job_id>', methods=['GET'])
+@login_required
+def task_status(job_id):
+    # Other users' jobs are reported as unknown, not forbidden
+    with _DB_LOCK:
+        row = _DB.execute(
+            'SELECT status, result FROM find_jobs WHERE job_id = ? AND owner = ?',
+            (job_id, current_user.get_id())
+        ).fetchone()
+    if row is None:
+        return jsonify({'success': False, 'error': 'Unknown task'}), 404
     
-    opportunities = arbitrage_engine.find_opportunities(
-        source_platform=source,
-        target_platform=target,
-        query=query,
-        min_profit=min_profit,
-        min_margin=min_margin,
-        max_results=max_results
-    )
+    status, result = row
+    if status == 'pending':
+        return jsonify({'success': True, 'job_id': job_id, 'status': 'pending'})
     
-    # Convert opportunities to dict for JSON serialization
-    opportunities_data = [
-        {
-            'title': opp.source_product.get('title', 'No title'),
-            'source_price': f"${opp.source_product.get('price', 0):.2f}",
-            'target_price': f"${opp.target_price:.2f}",
-            'profit': f"${opp.profit:.2f}",
-            'profit_margin': f"{opp.profit_margin:.1f}%",
-            'source_url': opp.source_product.get('url', '#')
-        }
-        for opp in opportunities
-    ]
+    if status == 'failed':
+        return jsonify({'success': False, 'job_id': job_id, 'status': 'failed'}), 500
     
+    opportunities_data = orjson.loads(result)
     return jsonify({
         'success': True,
+        'job_id': job_id,
+        'status': 'finished',
         'count': len(opportunities_data),
         'opportunities': opportunities_data
     })
@@ -316,7 +617,7 @@ def not_found_error(error):
 @app.errorhandler(500)
 def internal_error(error):
     # Generate a unique error ID for support reference
-    error_id = str(uuid.uuid4())
+    error_id = f"{_ERR_PREFIX}-{next(_ERR_COUNTER):x}"
     return render_template('errors/500.html', error_id=error_id), 500
 
 @app.errorhandler(403)
@@ -6,13 +6,16 @@ import re
 
 auth = Blueprint('auth', __name__)
 
+_USERNAME_RE = re.compile(r'^\w+$')
+_PASSWORD_RE = re.compile(r'^(?=.*\d)(?=.*[a-z])(?=.*[A-Z]).{8,}$')
+
 def is_valid_username(username):
     """Check if username contains only letters, numbers, and underscores."""
-    return bool(re.match(r'^\w+$', username))
+    return _USERNAME_RE.match(username) is not None
 
 def is_valid_password(password):
     """Check if password meets complexity requirements."""
-    return bool(re.match(r'^(?=.*\d)(?=.*[a-z])(?=.*[A-Z]).{8,}$', password))
+    return _PASSWORD_RE.match(password) is not None
 
 @auth.route('/login', methods=['GET', 'POST'])
 def login():
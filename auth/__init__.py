@@ -4,13 +4,28 @@ from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from ..models import db, User, Role, Notification
 from ..forms import LoginForm, RegistrationForm, ResetPasswordRequestForm, ResetPasswordForm
-from ..utils import send_email, log_activity
+from ..utils import send_email_async, log_activity
+from itsdangerous import URLSafeTimedSerializer, SignatureExpired, BadSignature
 from datetime import datetime
+from functools import lru_cache
 import logging
 
 # Create blueprint
 auth = Blueprint('auth', __name__)
 
+# Token salts and lifetimes; distinct salts keep reset and confirm tokens apart
+RESET_PASSWORD_SALT = 'reset-password'
+RESET_PASSWORD_MAX_AGE = 3600  # 1 hour
+CONFIRM_EMAIL_SALT = 'confirm-email'
+CONFIRM_EMAIL_MAX_AGE = 86400  # 24 hours
+
+@lru_cache(maxsize=8)
+def _get_serializer(secret_key, salt):
+    return URLSafeTimedSerializer(secret_key, salt=salt)
+
+def _serializer(salt):
+    return _get_serializer(current_app.config['SECRET_KEY'], salt)
+
 @auth.route('/login', methods=['GET', 'POST'])
 def login():
     """User login."""
@@ -70,16 +85,8 @@ def register():
     
     form = RegistrationForm()
     if form.validate_on_submit():
-        # Check if user already exists
-        if User.query.filter_by(email=form.email.data).first():
-            flash('Email already registered. Please use a different email.', 'warning')
-            return redirect(url_for('auth.register'))
-        
-        if User.query.filter_by(username=form.username.data).first():
-            flash('Username already taken. Please choose a different one.', 'warning')
-            return redirect(url_for('auth.register'))
-        
-        # Create new user
+        # Create new user (RegistrationForm.validate() already rejected
+        # taken usernames and emails)
         user = User(
             email=form.email.data.lower(),
             username=form.username.data,
@@ -95,15 +102,12 @@ def register():
         db.session.commit()
         
         # Send welcome email
-        try:
-            send_email(
-                subject='Welcome to Super Arbitrage!',
-                recipients=[user.email],
-                text_body=render_template('email/welcome.txt', user=user),
-                html_body=render_template('email/welcome.html', user=user)
-            )
-        except Exception as e:
-            current_app.logger.error(f'Failed to send welcome email: {str(e)}')
+        send_email_async(
+            subject='Welcome to Super Arbitrage!',
+            recipients=[user.email],
+            text_body=render_template('email/welcome.txt', user=user),
+            html_body=render_template('email/welcome.html', user=user)
+        )
         
         # Create welcome notification
         Notification.create_welcome_notification(user)
@@ -128,26 +132,20 @@ def reset_password_request():
         user = User.query.filter_by(email=form.email.data).first()
         if user:
             # Generate password reset token
-            from itsdangerous import TimedJSONWebSignatureSerializer as Serializer
-            s = Serializer(current_app.config['SECRET_KEY'], expires_in=3600)  # 1 hour expiration
-            token = s.dumps({'user_id': user.id}).decode('utf-8')
+            token = _serializer(RESET_PASSWORD_SALT).dumps(user.id)
             
             # Send password reset email
             reset_url = url_for('auth.reset_password', token=token, _external=True)
             
-            try:
-                send_email(
-                    subject='Reset Your Password',
-                    recipients=[user.email],
-                    text_body=render_template('email/reset_password.txt',
-                                           user=user, reset_url=reset_url),
-                    html_body=render_template('email/reset_password.html',
-                                           user=user, reset_url=reset_url)
-                )
-                flash('Check your email for instructions to reset your password', 'info')
-            except Exception as e:
-                current_app.logger.error(f'Failed to send password reset email: {str(e)}')
-                flash('Failed to send password reset email. Please try again later.', 'danger')
+            send_email_async(
+                subject='Reset Your Password',
+                recipients=[user.email],
+                text_body=render_template('email/reset_password.txt',
+                                       user=user, reset_url=reset_url),
+                html_body=render_template('email/reset_password.html',
+                                       user=user, reset_url=reset_url)
+            )
+            flash('Check your email for instructions to reset your password', 'info')
         else:
             # Don't reveal that the email doesn't exist
             flash('If your email is registered, you will receive a password reset link.', 'info')
@@ -164,13 +162,9 @@ def reset_password(token):
         return redirect(url_for('main.dashboard'))
     
     # Verify token
-    from itsdangerous import TimedJSONWebSignatureSerializer as Serializer
-    from itsdangerous import SignatureExpired, BadSignature
-    s = Serializer(current_app.config['SECRET_KEY'])
-    
     try:
-        data = s.loads(token)
-        user = User.query.get(data.get('user_id'))
+        user_id = _serializer(RESET_PASSWORD_SALT).loads(token, max_age=RESET_PASSWORD_MAX_AGE)
+        user = db.session.get(User, user_id)
         
         if not user:
             flash('Invalid or expired token.', 'danger')
@@ -201,13 +195,9 @@ def confirm_email(token):
         return redirect(url_for('main.dashboard'))
     
     # Verify token
-    from itsdangerous import TimedJSONWebSignatureSerializer as Serializer
-    from itsdangerous import SignatureExpired, BadSignature
-    s = Serializer(current_app.config['SECRET_KEY'])
-    
     try:
-        data = s.loads(token)
-        user = User.query.get(data.get('user_id'))
+        user_id = _serializer(CONFIRM_EMAIL_SALT).loads(token, max_age=CONFIRM_EMAIL_MAX_AGE)
+        user = db.session.get(User, user_id)
         
         if not user:
             flash('Invalid or expired confirmation link.', 'danger')
@@ -241,25 +231,19 @@ def resend_confirmation():
         return redirect(url_for('main.dashboard'))
     
     # Generate confirmation token
-    from itsdangerous import TimedJSONWebSignatureSerializer as Serializer
-    s = Serializer(current_app.config['SECRET_KEY'], expires_in=86400)  # 24 hours
-    token = s.dumps({'user_id': current_user.id}).decode('utf-8')
+    token = _serializer(CONFIRM_EMAIL_SALT).dumps(current_user.id)
     
     # Send confirmation email
     confirm_url = url_for('auth.confirm_email', token=token, _external=True)
     
-    try:
-        send_email(
-            subject='Confirm Your Email',
-            recipients=[current_user.email],
-            text_body=render_template('email/confirm_email.txt',
-                                   user=current_user, confirm_url=confirm_url),
-            html_body=render_template('email/confirm_email.html',
-                                   user=current_user, confirm_url=confirm_url)
-        )
-        flash('A new confirmation email has been sent. Please check your inbox.', 'info')
-    except Exception as e:
-        current_app.logger.error(f'Failed to send confirmation email: {str(e)}')
-        flash('Failed to send confirmation email. Please try again later.', 'danger')
+    send_email_async(
+        subject='Confirm Your Email',
+        recipients=[current_user.email],
+        text_body=render_template('email/confirm_email.txt',
+                               user=current_user, confirm_url=confirm_url),
+        html_body=render_template('email/confirm_email.html',
+                               user=current_user, confirm_url=confirm_url)
+    )
+    flash('A new confirmation email has been sent. Please check your inbox.', 'info')
     
     return redirect(url_for('main.dashboard'))
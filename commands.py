@@ -3,19 +3,21 @@ import click
 from flask import current_app
 from flask.cli import with_appcontext
 from .extensions import db
-from .models import User, Role, Marketplace
+from .models import User, Role, Marketplace, ActivityLog
 import json
 import os
 from datetime import datetime
 
 
 def register_commands(app):
-    ""Register Click commands with the Flask application."""
+    """Register Click commands with the Flask application."""
     app.cli.add_command(init_db_command)
     app.cli.add_command(create_user_command)
     app.cli.add_command(import_marketplaces_command)
     app.cli.add_command(clear_cache_command)
     app.cli.add_command(generate_api_key_command)
+    app.cli.add_command(flush_activity_log_command)
+    app.cli.add_command(refresh_dashboard_stats_command)
 
 
 @click.command('init-db')
@@ -23,6 +25,11 @@ def register_commands(app):
 def init_db_command():
     """Initialize the database."""
     try:
+        if db.engine.dialect.name == 'sqlite':
+            # WAL persists in the database file, so the app's later writes
+            # start on the faster journal
+            with db.engine.connect() as conn:
+                conn.exec_driver_sql('PRAGMA journal_mode=WAL')
         db.create_all()
         click.echo('Initialized the database.')
         
@@ -138,3 +145,38 @@ def generate_api_key_command(user_email):
         
     except Exception as e:
         click.echo(f'Error generating API key: {str(e)}', err=True)
+
+
+@click.command('flush-activity-log')
+@click.option('--follow', is_flag=True, help='Keep waiting for new entries instead of exiting')
+@with_appcontext
+def flush_activity_log_command(follow):
+    """Move buffered activity log entries from Redis into the database."""
+    from .utils import get_redis
+    
+    redis_conn = get_redis()
+    if redis_conn is None:
+        click.echo('REDIS_URL is not configured; activity is logged directly.', err=True)
+        return
+    
+    stream = current_app.config['ACTIVITY_LOG_STREAM']
+    while True:
+        written = ActivityLog.flush_stream(redis_conn, stream, block=5000 if follow else None)
+        if written:
+            click.echo(f'Wrote {written} activity log entries.')
+        if not follow:
+            break
+
+
+@click.command('refresh-dashboard-stats')
+@with_appcontext
+def refresh_dashboard_stats_command():
+    """Refresh the dashboard counters view (run every minute from cron)."""
+    if db.engine.dialect.name != 'postgresql':
+        click.echo('Dashboard counters are only precomputed on PostgreSQL.', err=True)
+        return
+    
+    # CONCURRENTLY keeps the view readable while it refreshes
+    db.session.execute(db.text('REFRESH MATERIALIZED VIEW CONCURRENTLY mv_user_dashboard_stats'))
+    db.session.commit()
+    click.echo('Dashboard counters refreshed.')
@@ -2,44 +2,89 @@
 Configuration module for Super Arbitrage.
 Handles loading configuration from YAML files and environment variables.
 """
-import os
+from functools import lru_cache
+from itertools import chain
 from pathlib import Path
 import yaml
-from dotenv import load_dotenv
+from ._env import ENV, ensure_env_loaded
+
+# Prefer the libyaml C loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
 
 # Load environment variables from .env file
-load_dotenv()
+ensure_env_loaded()
 
 class Config:
     """Base configuration class."""
     DEBUG = False
     TESTING = False
-    SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-key-for-super-arbitrage')
+    SECRET_KEY = ENV.get('SECRET_KEY', 'dev-key-for-super-arbitrage')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
     # Rate limiting
     RATELIMIT_DEFAULT = "200 per day"
     RATELIMIT_STORAGE_URL = "memory://"
     
+    # Caching
+    CACHE_TYPE = 'SimpleCache'
+    CACHE_DEFAULT_TIMEOUT = 300
+    
+    # Activity log buffering: with REDIS_URL set, log_activity appends to this
+    # stream and ActivityLog.flush_stream moves entries into the table
+    REDIS_URL = ENV.get('REDIS_URL')
+    ACTIVITY_LOG_STREAM = 'activity_log'
+    ACTIVITY_LOG_STREAM_MAXLEN = 100000
+    
     # Session settings
     PERMANENT_SESSION_LIFETIME = 3600  # 1 hour
+    SESSION_PROTECTION = 'strong'  # Flask-Login
     
     # File upload settings
     UPLOAD_FOLDER = 'data/uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     
+    @staticmethod
+    def init_app(app):
+        """Hook for per-environment app setup; nothing to do by default."""
+    
+    def __getattr__(self, name):
+        """Load the YAML overlays on the first attribute miss, then retry."""
+        if name.startswith('__') or self.__dict__.get('_yaml_loaded'):
+            raise AttributeError(name)
+        self._yaml_loaded = True
+        overlays = (self.load_yaml_config(path).items() for path in _LAZY_SOURCES.values())
+        vars(self).update(chain.from_iterable(overlays))
+        return getattr(self, name)
+    
     @classmethod
     def load_yaml_config(cls, config_path):
-        """Load configuration from YAML file."""
-        if not Path(config_path).exists():
+        """Load configuration from YAML file.
+        
+        Parsed files are cached. In development the cache is keyed on the
+        file's mtime so edits are picked up; elsewhere the first load is
+        kept for the life of the process.
+        """
+        try:
+            if ENV.get('FLASK_ENV', 'development') == 'development':
+                mtime = Path(config_path).stat().st_mtime_ns
+            else:
+                mtime = None
+            return _load_yaml_cached(str(config_path), mtime)
+        except FileNotFoundError:
             return {}
-        with open(config_path, 'r') as f:
-            return yaml.safe_load(f) or {}
+
+@lru_cache(maxsize=None)
+def _load_yaml_cached(config_path, mtime):
+    with open(config_path, 'r') as f:
+        return yaml.load(f, Loader=_YamlLoader) or {}
 
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///data/development.db')
+    SQLALCHEMY_DATABASE_URI = ENV.get('DATABASE_URL', 'sqlite:///data/development.db')
     
     # Enable detailed logging
     LOG_LEVEL = 'DEBUG'
@@ -48,13 +93,17 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql://localhost/superarb')
+    SQLALCHEMY_DATABASE_URI = ENV.get('DATABASE_URL', 'postgresql://localhost/superarb')
     
     # Security settings
     SESSION_COOKIE_SECURE = True
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     
+    # Shared cache so every worker sees the same entries and invalidations
+    CACHE_TYPE = 'RedisCache'
+    CACHE_REDIS_URL = ENV.get('CACHE_REDIS_URL', ENV.get('REDIS_URL', 'redis://localhost:6379/0'))
+    
     # Logging
     LOG_LEVEL = 'INFO'
 
@@ -63,21 +112,28 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    REDIS_URL = None
 
-# Load additional configurations
-dashboard_config = Config.load_yaml_config(Path(__file__).parent / 'dashboard.yaml')
-logging_config = Config.load_yaml_config(Path(__file__).parent / 'logging.yaml')
-notifications_config = Config.load_yaml_config(Path(__file__).parent / 'notifications.yaml')
+# Configuration classes by name, for create_app()
+config_by_name = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+    'default': DevelopmentConfig,
+}
+
+# Additional configurations, loaded onto ``config`` on first use
+_LAZY_SOURCES = {
+    'dashboard': Path(__file__).parent / 'dashboard.yaml',
+    'logging': Path(__file__).parent / 'logging.yaml',
+    'notifications': Path(__file__).parent / 'notifications.yaml',
+}
 
 # Select configuration based on environment
-env = os.environ.get('FLASK_ENV', 'development')
+env = ENV.get('FLASK_ENV', 'development')
 if env == 'production':
     config = ProductionConfig()
 elif env == 'testing':
     config = TestingConfig()
 else:
     config = DevelopmentConfig()
-
-# Update config with YAML settings
-for key, value in {**dashboard_config, **logging_config, **notifications_config}.items():
-    setattr(config, key, value)
@@ -0,0 +1,31 @@
+"""
+One-time loading of the project's .env file.
+
+``ENV`` is a read-only snapshot of ``.env`` overlaid with the process
+environment (the process wins, as with ``load_dotenv``). Config modules
+read from it instead of calling ``os.getenv``.
+"""
+import os
+import threading
+from types import MappingProxyType
+from dotenv import dotenv_values
+
+_DOTENV = {key: value for key, value in dotenv_values().items() if value is not None}
+ENV = MappingProxyType({**_DOTENV, **os.environ})
+
+_loaded = False
+_lock = threading.Lock()
+
+def ensure_env_loaded():
+    """Export .env into os.environ on the first call; later calls are no-ops.
+    
+    Uses the already-parsed snapshot, so the file is read only once.
+    """
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if not _loaded:
+            for key, value in _DOTENV.items():
+                os.environ.setdefault(key, value)
+            _loaded = True
@@ -1,37 +1,7 @@
-import os
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
-
-class Config:
-    # Database configuration
-    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'postgresql://localhost/super_arb')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
-    
-    # Secret key for session management
-    SECRET_KEY = os.getenv('SECRET_KEY', 'dev-key-change-me-in-production')
-    
-    # Flask-Login settings
-    SESSION_PROTECTION = 'strong'
-    
-    # Other configurations can be added here
-
-class DevelopmentConfig(Config):
-    DEBUG = True
-    SQLALCHEMY_ECHO = True
-
-class ProductionConfig(Config):
-    DEBUG = False
-    
-    # Ensure secure settings for production
-    SESSION_COOKIE_SECURE = True
-    SESSION_COOKIE_HTTPONLY = True
-    SESSION_COOKIE_SAMESITE = 'Lax'
+"""
+Compatibility shim: the configuration classes live in the ``config`` package.
+"""
+from . import Config, DevelopmentConfig, ProductionConfig, TestingConfig, config_by_name
 
 # Configuration dictionary for easy access
-config = {
-    'development': DevelopmentConfig,
-    'production': ProductionConfig,
-    'default': DevelopmentConfig
-}
+config = config_by_name
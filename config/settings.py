@@ -1,23 +1,24 @@
-import os
-from dotenv import load_dotenv
-
-# Load environment variables from .env file
-load_dotenv()
+from types import SimpleNamespace
+from ._env import ENV
 
 # API Configuration
-class APIConfig:
+# Snapshot of the marketplace credentials, taken once at import. Read them
+# from APIConfig rather than reading the environment again on request paths.
+_API_ENV_KEYS = (
     # Amazon API
-    AMAZON_ACCESS_KEY = os.getenv('AMAZON_ACCESS_KEY')
-    AMAZON_SECRET_KEY = os.getenv('AMAZON_SECRET_KEY')
-    AMAZON_ASSOC_TAG = os.getenv('AMAZON_ASSOC_TAG')
+    'AMAZON_ACCESS_KEY',
+    'AMAZON_SECRET_KEY',
+    'AMAZON_ASSOC_TAG',
     
     # eBay API
-    EBAY_APP_ID = os.getenv('EBAY_APP_ID')
-    EBAY_CERT_ID = os.getenv('EBAY_CERT_ID')
-    EBAY_DEV_ID = os.getenv('EBAY_DEV_ID')
+    'EBAY_APP_ID',
+    'EBAY_CERT_ID',
+    'EBAY_DEV_ID',
     
     # AliExpress API
-    ALIEXPRESS_API_KEY = os.getenv('ALIEXPRESS_API_KEY')
+    'ALIEXPRESS_API_KEY',
+)
+APIConfig = SimpleNamespace(**{key: ENV.get(key) for key in _API_ENV_KEYS})
 
 # Scraping Configuration
 class ScrapingConfig:
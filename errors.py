@@ -2,9 +2,16 @@
 from flask import render_template, jsonify, request
 from . import db
 
+# HTML first, so ties (e.g. */*) keep rendering the HTML error page
+_NEGOTIATED_MIMES = ('text/html', 'application/json')
+
+def _wants_json(req):
+    """Whether the client prefers JSON over HTML, from one Accept-header match."""
+    return req.accept_mimetypes.best_match(_NEGOTIATED_MIMES) == 'application/json'
+
 def not_found_error(error):
     """Handle 404 errors."""
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    if _wants_json(request):
         response = jsonify({'error': 'Not found'})
         response.status_code = 404
         return response
@@ -13,7 +20,7 @@ def not_found_error(error):
 def internal_error(error):
     """Handle 500 errors."""
     db.session.rollback()
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    if _wants_json(request):
         response = jsonify({'error': 'Internal server error'})
         response.status_code = 500
         return response
@@ -21,7 +28,7 @@ def internal_error(error):
 
 def forbidden_error(error):
     """Handle 403 errors."""
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    if _wants_json(request):
         response = jsonify({'error': 'Forbidden'})
         response.status_code = 403
         return response
@@ -29,7 +36,7 @@ def forbidden_error(error):
 
 def ratelimit_error(error):
     """Handle 429 errors (rate limiting)."""
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    if _wants_json(request):
         response = jsonify({
             'error': 'Too many requests',
             'message': 'You have exceeded your request limit.'
@@ -40,7 +47,7 @@ def ratelimit_error(error):
 
 def bad_request_error(error):
     """Handle 400 errors."""
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    if _wants_json(request):
         response = jsonify({
             'error': 'Bad request',
             'message': str(error)
@@ -51,7 +58,7 @@ def bad_request_error(error):
 
 def unauthorized_error(error):
     """Handle 401 errors."""
-    if request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html:
+    if _wants_json(request):
         response = jsonify({
             'error': 'Unauthorized',
             'message': 'Authentication is required to access this resource.'
@@ -1,29 +1,61 @@
 """Flask extensions."""
+import threading
+import orjson
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from flask_mail import Mail
 from flask_caching import Cache
-from flask_assets import Environment
-from flask_wtf.csrf import CSRFProtect
+
+def _json_serializer(obj):
+    # JSON/JSONB bind values; orjson also handles datetimes and UUIDs natively
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(engine_options={'json_serializer': _json_serializer,
+                                'json_deserializer': orjson.loads})
 migrate = Migrate()
 login_manager = LoginManager()
-limiter = Limiter(key_func=get_remote_address)
-mail = Mail()
 cache = Cache()
-assets = Environment()
-csrf = CSRFProtect()
 
 # Configure login manager
 login_manager.login_view = 'auth.login'
 login_manager.login_message_category = 'info'
 
-@login_manager.user_loader
-def load_user(user_id):
-    from models.user import User
-    return User.query.get(int(user_id))
+# The user loader lives in models.user, next to User, so neither module
+# has to import the other lazily on each request
+
+# Web-only extensions are built on first attribute access (PEP 562), so
+# scripts that only need ``db`` never import or construct them
+def _make_limiter():
+    from flask_limiter import Limiter
+    from flask_limiter.util import get_remote_address
+    return Limiter(key_func=get_remote_address)
+
+def _make_mail():
+    from flask_mail import Mail
+    return Mail()
+
+def _make_assets():
+    from flask_assets import Environment
+    return Environment()
+
+def _make_csrf():
+    from flask_wtf.csrf import CSRFProtect
+    return CSRFProtect()
+
+_LAZY_EXTENSIONS = {
+    'limiter': _make_limiter,
+    'mail': _make_mail,
+    'assets': _make_assets,
+    'csrf': _make_csrf,
+}
+_lazy_lock = threading.Lock()
+
+def __getattr__(name):
+    factory = _LAZY_EXTENSIONS.get(name)
+    if factory is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _lazy_lock:
+        if name not in globals():
+            globals()[name] = factory()
+    return globals()[name]
@@ -1,20 +1,48 @@
 """Form classes for the Super Arbitrage application."""
 from flask_wtf import FlaskForm
 from wtforms import (StringField, PasswordField, BooleanField, SubmitField,
-                    TextAreaField, SelectField, DecimalField, IntegerField,
-                    DateField, DateTimeField, HiddenField, FileField)
+                    TextAreaField, SelectField, DecimalField, FileField)
 from wtforms.validators import (DataRequired, Email, EqualTo, Length, Optional,
-                               NumberRange, URL, ValidationError, InputRequired)
-from wtforms.widgets import PasswordInput
+                               NumberRange, URL, ValidationError)
+from sqlalchemy import event, or_
+from sqlalchemy.orm import object_session
 from .models import User, Marketplace
-from .utils import validate_url
+from .utils import validate_url, get_marketplace_choices, call_after_commit
+from .extensions import cache, db
+
+def _invalidate_marketplace_choices(mapper, connection, target):
+    # Flush time is too early: the row is not visible to other requests yet
+    call_after_commit(object_session(target),
+                      lambda: cache.delete_memoized(get_marketplace_choices))
+
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(Marketplace, _event, _invalidate_marketplace_choices)
+
+# Validators are stateless, so forms can share these instances
+_REQ_EMAIL = (DataRequired(), Email())
+_REQ_PASSWORD = (DataRequired(),
+                 Length(min=8, message='Password must be at least 8 characters long'))
+_REQ_CONFIRM_PASSWORD = (DataRequired(),
+                         EqualTo('password', message='Passwords must match'))
+_RKW_EMAIL = {"placeholder": "Enter your email"}
+
+# API key choices, also usable by API views that accept the same values
+_EXPIRES_CHOICES = (
+    ('3600', '1 Hour'),
+    ('86400', '1 Day'),
+    ('604800', '1 Week'),
+    ('2592000', '1 Month'),
+    ('0', 'Never'),
+)
+_PERM_CHOICES = (
+    ('read', 'Read Only'),
+    ('read_write', 'Read & Write'),
+    ('admin', 'Admin'),
+)
 
 class LoginForm(FlaskForm):
     """User login form."""
-    email = StringField('Email', validators=[
-        DataRequired(),
-        Email()
-    ], render_kw={"placeholder": "Enter your email"})
+    email = StringField('Email', validators=_REQ_EMAIL, render_kw=_RKW_EMAIL)
     
     password = PasswordField('Password', validators=[
         DataRequired()
@@ -32,60 +60,57 @@ class RegistrationForm(FlaskForm):
     ], render_kw={"placeholder": "Choose a username"})
     
     email = StringField('Email', validators=[
-        DataRequired(),
-        Email(),
+        *_REQ_EMAIL,
         Length(max=120)
-    ], render_kw={"placeholder": "Enter your email"})
+    ], render_kw=_RKW_EMAIL)
     
-    password = PasswordField('Password', validators=[
-        DataRequired(),
-        Length(min=8, message='Password must be at least 8 characters long')
-    ], render_kw={"placeholder": "Create a strong password"})
+    password = PasswordField('Password', validators=_REQ_PASSWORD,
+                             render_kw={"placeholder": "Create a strong password"})
     
-    confirm_password = PasswordField('Confirm Password', validators=[
-        DataRequired(),
-        EqualTo('password', message='Passwords must match')
-    ], render_kw={"placeholder": "Confirm your password"})
+    confirm_password = PasswordField('Confirm Password', validators=_REQ_CONFIRM_PASSWORD,
+                                     render_kw={"placeholder": "Confirm your password"})
     
     agree_terms = BooleanField('I agree to the Terms of Service and Privacy Policy', 
                              validators=[DataRequired()])
     
     submit = SubmitField('Create Account')
     
-    def validate_username(self, username):
-        """Check if username is already taken."""
-        user = User.query.filter_by(username=username.data).first()
-        if user is not None:
-            raise ValidationError('Please use a different username.')
-    
-    def validate_email(self, email):
-        """Check if email is already registered."""
-        user = User.query.filter_by(email=email.data.lower()).first()
-        if user is not None:
-            raise ValidationError('Please use a different email address.')
+    def validate(self, extra_validators=None):
+        """Run the field validators, then check username and email in one query."""
+        if not super(RegistrationForm, self).validate(extra_validators):
+            return False
+        
+        username = self.username.data
+        email = self.email.data.lower()
+        taken = db.session.query(User.username, User.email).filter(
+            or_(User.username == username, User.email == email)
+        ).all()
+        
+        valid = True
+        if any(row.username == username for row in taken):
+            self.username.errors.append('Please use a different username.')
+            valid = False
+        if any(row.email == email for row in taken):
+            self.email.errors.append('Please use a different email address.')
+            valid = False
+        return valid
 
 
 class ResetPasswordRequestForm(FlaskForm):
     """Request password reset form."""
-    email = StringField('Email', validators=[
-        DataRequired(),
-        Email()
-    ], render_kw={"placeholder": "Enter your email address"})
+    email = StringField('Email', validators=_REQ_EMAIL,
+                        render_kw={"placeholder": "Enter your email address"})
     
     submit = SubmitField('Request Password Reset')
 
 
 class ResetPasswordForm(FlaskForm):
     """Reset password form."""
-    password = PasswordField('New Password', validators=[
-        DataRequired(),
-        Length(min=8, message='Password must be at least 8 characters long')
-    ], render_kw={"placeholder": "Enter a new password"})
+    password = PasswordField('New Password', validators=_REQ_PASSWORD,
+                             render_kw={"placeholder": "Enter a new password"})
     
-    confirm_password = PasswordField('Confirm New Password', validators=[
-        DataRequired(),
-        EqualTo('password', message='Passwords must match')
-    ], render_kw={"placeholder": "Confirm your new password"})
+    confirm_password = PasswordField('Confirm New Password', validators=_REQ_CONFIRM_PASSWORD,
+                                     render_kw={"placeholder": "Confirm your new password"})
     
     submit = SubmitField('Reset Password')
 
@@ -173,9 +198,7 @@ class MarketplaceCredentialsForm(FlaskForm):
     
     def __init__(self, *args, **kwargs):
         super(MarketplaceCredentialsForm, self).__init__(*args, **kwargs)
-        self.marketplace_id.choices = [
-            (m.id, m.name) for m in Marketplace.query.order_by('name').all()
-        ]
+        self.marketplace_id.choices = get_marketplace_choices()
 
 
 class OpportunityFilterForm(FlaskForm):
@@ -218,8 +241,7 @@ class OpportunityFilterForm(FlaskForm):
     def __init__(self, *args, **kwargs):
         super(OpportunityFilterForm, self).__init__(*args, **kwargs)
         # Populate marketplace choices
-        marketplaces = Marketplace.query.order_by('name').all()
-        marketplace_choices = [(0, 'All Marketplaces')] + [(m.id, m.name) for m in marketplaces]
+        marketplace_choices = [(0, 'All Marketplaces')] + get_marketplace_choices()
         self.source_marketplace_id.choices = marketplace_choices
         self.target_marketplace_id.choices = marketplace_choices
 
@@ -262,9 +284,7 @@ class ImportProductsForm(FlaskForm):
     
     def __init__(self, *args, **kwargs):
         super(ImportProductsForm, self).__init__(*args, **kwargs)
-        self.marketplace_id.choices = [
-            (m.id, m.name) for m in Marketplace.query.order_by('name').all()
-        ]
+        self.marketplace_id.choices = get_marketplace_choices()
 
 
 class APIKeyForm(FlaskForm):
@@ -274,18 +294,8 @@ class APIKeyForm(FlaskForm):
         Length(max=100)
     ], render_kw={"placeholder": "e.g., Mobile App, Integration X"})
     
-    expires_in = SelectField('Expires In', choices=[
-        (str(3600), '1 Hour'),
-        (str(86400), '1 Day'),
-        (str(604800), '1 Week'),
-        (str(2592000), '1 Month'),
-        ('0', 'Never')
-    ], default=str(2592000))
-    
-    permissions = SelectField('Permissions', choices=[
-        ('read', 'Read Only'),
-        ('read_write', 'Read & Write'),
-        ('admin', 'Admin')
-    ], default='read')
+    expires_in = SelectField('Expires In', choices=_EXPIRES_CHOICES, default='2592000')
+    
+    permissions = SelectField('Permissions', choices=_PERM_CHOICES, default='read')
     
     submit = SubmitField('Generate API Key')
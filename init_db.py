@@ -7,15 +7,10 @@ from datetime import datetime
 os.makedirs('data', exist_ok=True)
 os.makedirs('data/opportunities', exist_ok=True)
 
-# Connect to SQLite database (creates it if it doesn't exist)
-conn = sqlite3.connect('data/arbitrage.db')
-cursor = conn.cursor()
-
-# Enable foreign key support
-cursor.execute('PRAGMA foreign_keys = ON')
+# Full schema, applied in one script and one transaction
+SCHEMA_SQL = '''
+BEGIN;
 
-# Create users table
-cursor.execute('''
 CREATE TABLE IF NOT EXISTS users (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     username TEXT UNIQUE NOT NULL,
@@ -24,11 +19,8 @@ CREATE TABLE IF NOT EXISTS users (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     is_active BOOLEAN DEFAULT 1,
     is_admin BOOLEAN DEFAULT 0
-)
-''')
+);
 
-# Create products table
-cursor.execute('''
 CREATE TABLE IF NOT EXISTS products (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     title TEXT NOT NULL,
@@ -41,11 +33,8 @@ CREATE TABLE IF NOT EXISTS products (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     UNIQUE(source_marketplace, source_id)
-)
-''')
+);
 
-# Create arbitrage_opportunities table
-cursor.execute('''
 CREATE TABLE IF NOT EXISTS arbitrage_opportunities (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     source_product_id INTEGER,
@@ -60,29 +49,59 @@ CREATE TABLE IF NOT EXISTS arbitrage_opportunities (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (source_product_id) REFERENCES products (id) ON DELETE CASCADE,
     CHECK (status IN ('potential', 'active', 'sold', 'unavailable'))
-)
-''')
+);
 
-# Create price_history table
-try:
-    cursor.execute('''
-    CREATE TABLE price_history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        product_id INTEGER NOT NULL,
-        price DECIMAL(10, 2) NOT NULL,
-        recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (product_id) REFERENCES products (id) ON DELETE CASCADE
-    )
-    ''')
-    print("Created price_history table")
-except sqlite3.OperationalError:
-    print("price_history table already exists")
+CREATE TABLE IF NOT EXISTS price_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id INTEGER NOT NULL,
+    price DECIMAL(10, 2) NOT NULL,
+    recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (product_id) REFERENCES products (id) ON DELETE CASCADE
+);
+
+-- Triggers for updated_at timestamps
+CREATE TRIGGER IF NOT EXISTS update_products_timestamp
+AFTER UPDATE ON products
+BEGIN
+    UPDATE products SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS update_opportunities_timestamp
+AFTER UPDATE ON arbitrage_opportunities
+BEGIN
+    UPDATE arbitrage_opportunities SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+-- Indexes for better query performance
+CREATE INDEX IF NOT EXISTS idx_products_source ON products(source_marketplace, source_id);
+CREATE INDEX IF NOT EXISTS idx_opportunities_status ON arbitrage_opportunities(status);
+CREATE INDEX IF NOT EXISTS idx_opportunities_profit ON arbitrage_opportunities(estimated_profit);
+
+COMMIT;
+'''
+
+# Connect to SQLite database (creates it if it doesn't exist)
+conn = sqlite3.connect('data/arbitrage.db', isolation_level=None)
+cursor = conn.cursor()
+
+# Enable foreign key support and set up the write path before any DDL
+cursor.execute('PRAGMA foreign_keys = ON')
+cursor.execute('PRAGMA journal_mode=WAL')
+cursor.execute('PRAGMA synchronous=NORMAL')
+cursor.execute('PRAGMA temp_store=MEMORY')
+
+# Create tables, triggers and indexes
+cursor.executescript(SCHEMA_SQL)
 
 # Create an admin user (change the password in production!)
 admin_username = 'admin'
 admin_email = 'admin@example.com'
 admin_password = 'Admin@123'  # Change this in production!
-admin_password_hash = generate_password_hash(admin_password)
+# Dev seeding only needs a cheap hash; production accounts are created
+# through the app with its default (scrypt) hashing
+admin_password_hash = generate_password_hash(
+    admin_password, method=os.environ.get('PWHASH_METHOD', 'pbkdf2:sha256:50000')
+)
 
 try:
     cursor.execute(
@@ -94,30 +113,7 @@ try:
 except sqlite3.IntegrityError:
     print("Admin user already exists")
 
-# Create triggers for updated_at timestamps
-cursor.execute('''
-CREATE TRIGGER IF NOT EXISTS update_products_timestamp
-AFTER UPDATE ON products
-BEGIN
-    UPDATE products SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
-END;
-''')
-
-cursor.execute('''
-CREATE TRIGGER IF NOT EXISTS update_opportunities_timestamp
-AFTER UPDATE ON arbitrage_opportunities
-BEGIN
-    UPDATE arbitrage_opportunities SET updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
-END;
-''')
-
-# Create indexes for better query performance
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_products_source ON products(source_marketplace, source_id)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_opportunities_status ON arbitrage_opportunities(status)')
-cursor.execute('CREATE INDEX IF NOT EXISTS idx_opportunities_profit ON arbitrage_opportunities(estimated_profit)')
-
-# Commit changes and close connection
-conn.commit()
+# Close connection
 conn.close()
 
 print("Database initialized successfully at data/arbitrage.db")
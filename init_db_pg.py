@@ -3,6 +3,11 @@ from werkzeug.security import generate_password_hash
 from app import create_app, db
 from models import User, Product
 
+# Hash method for the seeded admin account. The default matches what the app
+# uses for every other user; set e.g. PWHASH_METHOD=pbkdf2:sha256:50000 for
+# throwaway dev databases. Real accounts are created through the app.
+PWHASH_METHOD = os.environ.get('PWHASH_METHOD', 'scrypt')
+
 def init_db():
     """Initialize the database with required tables and admin user."""
     app = create_app('development')
@@ -18,7 +23,8 @@ def init_db():
             admin = User(
                 username='admin',
                 email='admin@example.com',
-                password='Admin@123'  # Change this in production!
+                password='Admin@123',  # Change this in production!
+                password_method=PWHASH_METHOD
             )
             db.session.add(admin)
             db.session.commit()
@@ -1,13 +1,25 @@
 """Main application blueprint."""
-from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, jsonify
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.orm import joinedload, object_session
 from ..models import db, ArbitrageOpportunity, Product, Notification
-from ..utils import admin_required
+from ..models.notification import NotificationStatus
+from ..models.opportunity import user_dashboard_stats
+from ..extensions import cache
+from ..utils import admin_required, paginate_keyset, list_loader_options, call_after_commit
 
 # Create blueprint
 main = Blueprint('main', __name__)
 
+# Everything an opportunity row renders, loaded with the row itself
+_OPPORTUNITY_LOADS = (
+    joinedload(ArbitrageOpportunity.product),
+    joinedload(ArbitrageOpportunity.source_marketplace),
+    joinedload(ArbitrageOpportunity.target_marketplace),
+)
+
 @main.route('/')
 def index():
     """Home page."""
@@ -19,38 +31,26 @@ def index():
 @login_required
 def dashboard():
     """User dashboard."""
-    # Get recent opportunities
+    # Get recent opportunities; ordering on the full (user_id, created_at)
+    # index key lets the planner read the top five off a backward index scan
     recent_opportunities = (ArbitrageOpportunity.query
+                          .options(*list_loader_options(*_OPPORTUNITY_LOADS))
                           .filter_by(user_id=current_user.id)
-                          .order_by(ArbitrageOpportunity.created_at.desc())
+                          .order_by(ArbitrageOpportunity.user_id.desc(),
+                                    ArbitrageOpportunity.created_at.desc())
                           .limit(5)
                           .all())
     
     # Get recent notifications
     recent_notifications = (Notification.query
+                          .options(*list_loader_options())
                           .filter_by(user_id=current_user.id)
-                          .order_by(Notification.created_at.desc())
+                          .order_by(Notification.user_id.desc(),
+                                    Notification.created_at.desc())
                           .limit(5)
                           .all())
     
-    # Get product count
-    product_count = Product.query.filter_by(owner_id=current_user.id).count()
-    
-    # Get active opportunity count
-    opportunity_count = ArbitrageOpportunity.query.filter_by(
-        user_id=current_user.id,
-        status='active'
-    ).count()
-    
-    # Calculate 7-day profit
-    week_ago = datetime.utcnow() - timedelta(days=7)
-    recent_profits = (db.session.query(db.func.sum(ArbitrageOpportunity.profit))
-                     .filter(
-                         ArbitrageOpportunity.user_id == current_user.id,
-                         ArbitrageOpportunity.status == 'completed',
-                         ArbitrageOpportunity.updated_at >= week_ago
-                     )
-                     .scalar() or 0)
+    product_count, opportunity_count, recent_profits = _dashboard_counts(current_user.id)
     
     return render_template('dashboard.html',
                          recent_opportunities=recent_opportunities,
@@ -59,6 +59,74 @@ def dashboard():
                          opportunity_count=opportunity_count,
                          recent_profits=recent_profits)
 
+@cache.memoize(timeout=60)
+def _dashboard_counts(user_id):
+    """Product count, active opportunity count and 7-day profit for a user."""
+    week_ago = datetime.utcnow() - timedelta(days=7)
+    
+    # One round trip of three scalar subqueries. Without the materialized
+    # view each is still answerable from an index: the active count from
+    # ix_opportunity_user_status_created and the profit sum by an index-only
+    # scan of the partial ix_opportunity_completed_user_updated
+    product_count = (db.select(db.func.count(Product.id))
+                     .where(Product.owner_id == user_id)
+                     .scalar_subquery())
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # PostgreSQL keeps the opportunity counters precomputed per user in
+        # a materialized view (`flask refresh-dashboard-stats`, every minute)
+        stats = user_dashboard_stats
+        active_count = (db.select(stats.c.active_count)
+                        .where(stats.c.user_id == user_id)
+                        .scalar_subquery())
+        recent_profit = (db.select(stats.c.profit_7d)
+                         .where(stats.c.user_id == user_id)
+                         .scalar_subquery())
+    else:
+        active_count = (db.select(db.func.count(ArbitrageOpportunity.id))
+                        .where(ArbitrageOpportunity.user_id == user_id,
+                               ArbitrageOpportunity.status == 'active')
+                        .scalar_subquery())
+        recent_profit = (db.select(db.func.sum(ArbitrageOpportunity.profit))
+                         .where(ArbitrageOpportunity.user_id == user_id,
+                                ArbitrageOpportunity.status == 'completed',
+                                ArbitrageOpportunity.updated_at >= week_ago)
+                         .scalar_subquery())
+    row = db.session.execute(db.select(
+        product_count,
+        db.func.coalesce(active_count, 0),
+        db.func.coalesce(recent_profit, 0)
+    )).one()
+    
+    return row[0], row[1], row[2]
+
+def invalidate_dashboard_counts(user_id, session=None):
+    """Drop a user's cached dashboard counters once the session's transaction commits."""
+    call_after_commit(session or db.session(),
+                      lambda: cache.delete_memoized(_dashboard_counts, user_id))
+
+def _invalidate_dashboard_counts(mapper, connection, target):
+    invalidate_dashboard_counts(target.user_id, object_session(target))
+
+def _invalidate_owner_dashboard_counts(mapper, connection, target):
+    # A new or deleted product changes its owner's product count
+    if target.owner_id is not None:
+        invalidate_dashboard_counts(target.owner_id, object_session(target))
+
+def _invalidate_reowned_dashboard_counts(target, value, oldvalue, initiator):
+    # active_history loads the previous owner, so both counts are dropped
+    session = object_session(target)
+    if session is None or value == oldvalue:
+        return
+    for owner_id in (value, oldvalue):
+        if isinstance(owner_id, int):
+            invalidate_dashboard_counts(owner_id, session)
+
+for _event in ('after_insert', 'after_update', 'after_delete'):
+    event.listen(ArbitrageOpportunity, _event, _invalidate_dashboard_counts)
+event.listen(Product, 'after_insert', _invalidate_owner_dashboard_counts)
+event.listen(Product, 'after_delete', _invalidate_owner_dashboard_counts)
+event.listen(Product.owner_id, 'set', _invalidate_reowned_dashboard_counts, active_history=True)
+
 @main.route('/find')
 @login_required
 def find():
@@ -69,7 +137,7 @@ def find():
 @login_required
 def opportunities():
     """View all arbitrage opportunities."""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = current_app.config['ITEMS_PER_PAGE']
     
     # Get filter parameters
@@ -90,9 +158,10 @@ def opportunities():
     if min_margin > 0:
         query = query.filter(ArbitrageOpportunity.profit_margin >= min_margin)
     
-    # Order and paginate
-    opportunities = (query.order_by(ArbitrageOpportunity.created_at.desc())
-                    .paginate(page=page, per_page=per_page, error_out=False))
+    # Seek past the cursor instead of counting and offsetting
+    opportunities = paginate_keyset(query.options(*list_loader_options(*_OPPORTUNITY_LOADS)),
+                                    ArbitrageOpportunity.created_at, ArbitrageOpportunity.id,
+                                    cursor=cursor, per_page=per_page)
     
     return render_template('opportunities.html',
                          opportunities=opportunities,
@@ -104,19 +173,24 @@ def opportunities():
 @login_required
 def view_opportunity(opportunity_id):
     """View details of a specific opportunity."""
-    opportunity = ArbitrageOpportunity.query.get_or_404(opportunity_id)
+    query = (ArbitrageOpportunity.query
+             .options(*_OPPORTUNITY_LOADS)
+             .filter_by(id=opportunity_id))
     
-    # Ensure the user owns this opportunity
-    if opportunity.user_id != current_user.id and not current_user.is_admin():
-        flash('You do not have permission to view this opportunity.', 'danger')
-        return redirect(url_for('main.opportunities'))
+    # Ownership is part of the WHERE clause; other users' opportunities 404
+    if not current_user.has_role('admin'):
+        query = query.filter_by(user_id=current_user.id)
+    opportunity = query.first_or_404()
     
     # Mark notification as read if accessed from notification
-    notification_id = request.args.get('notification_id')
+    notification_id = request.args.get('notification_id', type=int)
     if notification_id:
-        notification = Notification.query.get(notification_id)
-        if notification and notification.user_id == current_user.id:
+        notification = (Notification.query
+                        .filter_by(id=notification_id, user_id=current_user.id)
+                        .first())
+        if notification:
             notification.mark_as_read()
+            db.session.commit()
     
     return render_template('view_opportunity.html', opportunity=opportunity)
 
@@ -136,29 +210,32 @@ def settings():
 @login_required
 def notifications():
     """User notifications page."""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = current_app.config['ITEMS_PER_PAGE']
     
     # Get filter parameters
     status = request.args.get('status', 'unread')
     
     # Base query
-    query = Notification.query.filter_by(user_id=current_user.id)
+    query = Notification.query.options(*list_loader_options()).filter_by(user_id=current_user.id)
     
     # Apply status filter
     if status != 'all':
         query = query.filter_by(status=status)
     
-    # Order and paginate
-    notifications = (query.order_by(Notification.created_at.desc())
-                    .paginate(page=page, per_page=per_page, error_out=False))
+    # Seek past the cursor instead of counting and offsetting
+    notifications = paginate_keyset(query, Notification.created_at, Notification.id,
+                                    cursor=cursor, per_page=per_page)
     
     # Mark all as read if requested
     if request.args.get('mark_read') == 'all':
-        for notification in notifications.items:
-            if notification.status != 'read':
-                notification.mark_as_read(commit=False)
-        db.session.commit()
+        unread_ids = [n.id for n in notifications.items
+                      if n.status != NotificationStatus.READ.value]
+        if unread_ids:
+            Notification.query.filter(Notification.id.in_(unread_ids))\
+                .update({'status': NotificationStatus.READ.value, 'read_at': datetime.utcnow()},
+                        synchronize_session=False)
+            db.session.commit()
         flash('All notifications marked as read.', 'success')
     
     return render_template('notifications.html',
@@ -170,7 +247,7 @@ def notifications():
 def mark_all_read():
     """Mark all notifications as read."""
     Notification.query.filter_by(user_id=current_user.id, status='unread')\
-        .update({'status': 'read', 'read_at': datetime.utcnow()})
+        .update({'status': 'read', 'read_at': datetime.utcnow()}, synchronize_session=False)
     db.session.commit()
     
     if request.is_json:
@@ -193,6 +270,7 @@ def mark_notification_read(notification_id):
         return redirect(url_for('main.notifications'))
     
     notification.mark_as_read()
+    db.session.commit()
     
     if request.is_json:
         return jsonify({'status': 'success'})
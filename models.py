@@ -18,13 +18,13 @@ class User(UserMixin, db.Model):
     # Relationships
     products = db.relationship('Product', backref='owner', lazy='dynamic')
     
-    def __init__(self, username, email, password):
+    def __init__(self, username, email, password, password_method='scrypt'):
         self.username = username
         self.email = email.lower()
-        self.set_password(password)
+        self.set_password(password, method=password_method)
     
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+    def set_password(self, password, method='scrypt'):
+        self.password_hash = generate_password_hash(password, method=method)
     
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
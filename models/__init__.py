@@ -1,14 +1,45 @@
 """Database models for Super Arbitrage."""
+from sqlalchemy import DDL, event
+from sqlalchemy.orm import aliased
+from .. import db
 from .user import User, Role, roles_users
 from .product import Product, ProductPriceHistory
 from .opportunity import ArbitrageOpportunity, OpportunityAlert
 from .marketplace import Marketplace, MarketplaceCredentials
 from .notification import Notification
+from .api_key import APIKey
+from .activity_log import ActivityLog
+
+# The trigram search indexes need pg_trgm before any table is created
+event.listen(
+    db.metadata, 'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql')
+)
+
+# Newest price row per product, as a relationship so a page of products can
+# select-in load exactly one row each instead of whole histories. Declared
+# here because aliasing the model needs every mapper importable.
+_ranked_prices = db.select(
+    ProductPriceHistory,
+    db.func.row_number().over(
+        partition_by=ProductPriceHistory.product_id,
+        order_by=(ProductPriceHistory.timestamp.desc(), ProductPriceHistory.id.desc())
+    ).label('price_rank')
+).subquery()
+_latest_price = aliased(ProductPriceHistory, _ranked_prices)
+
+Product.latest_price = db.relationship(
+    _latest_price,
+    primaryjoin=db.and_(_latest_price.product_id == Product.id, _ranked_prices.c.price_rank == 1),
+    uselist=False,
+    viewonly=True,
+    lazy='selectin',
+)
 
 __all__ = [
     'User', 'Role', 'roles_users',
     'Product', 'ProductPriceHistory',
     'ArbitrageOpportunity', 'OpportunityAlert',
     'Marketplace', 'MarketplaceCredentials',
-    'Notification'
+    'Notification', 'APIKey', 'ActivityLog'
 ]
@@ -1,28 +1,36 @@
 """Activity Log model for tracking user actions."""
-from datetime import datetime
+import os
+import socket
+from datetime import datetime, timedelta, timezone
+import orjson
 from .. import db
 from sqlalchemy.dialects.postgresql import JSONB
 
 class ActivityLog(db.Model):
     """Activity Log model for tracking user actions."""
     __tablename__ = 'activity_logs'
+    __table_args__ = (
+        # Trigram index serves ILIKE '%term%' on action; the expression index
+        # serves full-text matches inside details (see search_activities)
+        db.Index('ix_activity_action_trgm', 'action', postgresql_using='gin',
+                 postgresql_ops={'action': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        db.Index('ix_activity_details_tsv', db.text("to_tsvector('simple', details)"),
+                 postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), nullable=True)
     action = db.Column(db.String(100), nullable=False, index=True)
-    details = db.Column(JSONB, nullable=True)
+    details = db.Column(db.JSON().with_variant(JSONB, 'postgresql'), nullable=True)
     ip_address = db.Column(db.String(45), nullable=True)  # IPv6 can be up to 45 chars
     user_agent = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # Set in Python so SQLite keeps microseconds, like the keyset cursor does;
+    # the server default only covers rows written outside the ORM
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                           server_default=db.func.now(), nullable=False, index=True)
     
     # Relationships
-    user = db.relationship('User', backref=db.backref('activities', lazy=True))
-    
-    def __init__(self, **kwargs):
-        """Initialize activity log with default values."""
-        super(ActivityLog, self).__init__(**kwargs)
-        if not self.created_at:
-            self.created_at = datetime.utcnow()
+    user = db.relationship('User', back_populates='activities')
     
     def __repr__(self):
         """String representation of the activity log."""
@@ -67,6 +75,79 @@ class ActivityLog(db.Model):
         
         return log
     
+    @classmethod
+    def flush_stream(cls, redis_conn, stream, group='activity-log-writers',
+                     consumer=None, batch_size=1000, block=None, claim_idle=60000):
+        """Move entries buffered by ``utils.log_activity`` into the table.
+        
+        Reads the stream through a consumer group, inserts each batch of up
+        to ``batch_size`` rows with one executemany and acknowledges it only
+        after the commit. Entries another writer left unacknowledged for
+        ``claim_idle`` milliseconds (e.g. it crashed and came back under a
+        new name) are claimed and written too, so every entry is written at
+        least once. Returns the number of rows written once the stream is
+        drained (or after ``block`` milliseconds without new entries).
+        """
+        import redis
+        
+        consumer = consumer or f'{socket.gethostname()}-{os.getpid()}'
+        try:
+            redis_conn.xgroup_create(stream, group, id='0', mkstream=True)
+        except redis.ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        
+        # Re-deliver anything this consumer read but never acknowledged first
+        written = cls._read_group(redis_conn, stream, group, consumer, '0', batch_size)
+        
+        # Then take over what other consumers left pending
+        start_id = '0-0'
+        while True:
+            start_id, entries, *_ = redis_conn.xautoclaim(stream, group, consumer, claim_idle,
+                                                          start_id=start_id, count=batch_size)
+            written += cls._write_entries(redis_conn, stream, group, entries)
+            if start_id in (b'0-0', '0-0'):
+                break
+        
+        return written + cls._read_group(redis_conn, stream, group, consumer, '>',
+                                         batch_size, block)
+    
+    @classmethod
+    def _read_group(cls, redis_conn, stream, group, consumer, last_id, batch_size, block=None):
+        """Write batches read from ``last_id`` until a short batch comes back."""
+        written = 0
+        while True:
+            response = redis_conn.xreadgroup(group, consumer, {stream: last_id},
+                                             count=batch_size, block=block)
+            entries = response[0][1] if response else []
+            written += cls._write_entries(redis_conn, stream, group, entries)
+            if len(entries) < batch_size:
+                return written
+    
+    @classmethod
+    def _write_entries(cls, redis_conn, stream, group, entries):
+        """Insert stream entries in one executemany, then acknowledge them."""
+        if not entries:
+            return 0
+        
+        rows = []
+        for _, fields in entries:
+            # Trimmed from the stream while pending; nothing left to write
+            if not fields:
+                continue
+            row = orjson.loads(fields[b'entry'])
+            row['created_at'] = datetime.fromisoformat(row['created_at'])
+            rows.append(row)
+        if rows:
+            try:
+                db.session.execute(db.insert(cls), rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+        redis_conn.xack(stream, group, *[entry_id for entry_id, _ in entries])
+        return len(rows)
+    
     @classmethod
     def get_user_activities(cls, user_id, page=1, per_page=20):
         """Get paginated activities for a user."""
@@ -83,16 +164,41 @@ class ActivityLog(db.Model):
     def search_activities(cls, query, page=1, per_page=20):
         """Search activities by action or details."""
         search = f"%{query}%"
+        if db.engine.dialect.name == 'postgresql':
+            # Must match the ix_activity_details_tsv expression to use the index
+            simple = db.literal_column("'simple'")
+            details_match = db.func.to_tsvector(simple, cls.details).op('@@')(
+                db.func.websearch_to_tsquery(simple, query)
+            )
+        else:
+            # No full-text functions elsewhere (e.g. SQLite in development)
+            details_match = db.cast(cls.details, db.Text).ilike(search)
         return cls.query.filter(
-            (cls.action.ilike(search)) |
-            (cls.details.cast(db.String).ilike(search))
+            (cls.action.ilike(search)) | details_match
         ).order_by(cls.created_at.desc())\
          .paginate(page=page, per_page=per_page, error_out=False)
     
     @classmethod
-    def cleanup_old_logs(cls, days=90):
-        """Remove activity logs older than the specified number of days."""
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        deleted = cls.query.filter(cls.created_at < cutoff_date).delete()
-        db.session.commit()
-        return deleted
+    def cleanup_old_logs(cls, days=90, batch_size=10000):
+        """Remove activity logs older than the specified number of days.
+        
+        Deletes in batches of ``batch_size`` rows, committing each one, so a
+        large backlog never holds row locks for long or builds one huge WAL
+        burst, and autovacuum can keep up between batches.
+        """
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+        batch = (db.select(cls.id)
+                   .where(cls.created_at < cutoff_date)
+                   .limit(batch_size)
+                   .scalar_subquery())
+        
+        deleted = 0
+        while True:
+            count = db.session.execute(
+                db.delete(cls).where(cls.id.in_(batch)),
+                execution_options={'synchronize_session': False}
+            ).rowcount
+            db.session.commit()
+            deleted += count
+            if count < batch_size:
+                return deleted
@@ -1,31 +1,87 @@
 """API Key model for user authentication."""
-from datetime import datetime, timedelta
+import hashlib
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import make_transient_to_detached, object_session
+from sqlalchemy.orm.attributes import set_committed_value
 from .. import db
+from ..extensions import cache
+from ..utils import call_after_commit
+
+# Column values of recently validated keys live in the shared cache (Redis in
+# production), so a revocation on one worker is seen by all of them. Entries
+# are keyed on the key's SHA-256 and leave out the raw key, which the caller
+# already has. They are evicted when the row is updated or deleted through
+# the ORM; changes made outside the ORM take up to KEY_CACHE_TIMEOUT to be
+# noticed.
+KEY_CACHE_TIMEOUT = 60
+
+# last_used_at is informational; don't write it more often than this
+LAST_USED_RESOLUTION = timedelta(seconds=60)
+
+def _cache_key(key):
+    return 'api_key:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+# last_used_at writes are queued and flushed in batches by one daemon thread
+LAST_USED_FLUSH_INTERVAL = 5  # seconds
+LAST_USED_BATCH_SIZE = 1000
+_last_used_queue = queue.Queue()
+_last_used_worker = None
+_last_used_worker_lock = threading.Lock()
+
+def _last_used_worker_loop(app):
+    while True:
+        time.sleep(LAST_USED_FLUSH_INTERVAL)
+        # Collapse repeated uses of a key to its latest timestamp
+        latest = {}
+        while len(latest) < LAST_USED_BATCH_SIZE:
+            try:
+                key_id, used_at = _last_used_queue.get_nowait()
+            except queue.Empty:
+                break
+            if key_id not in latest or used_at > latest[key_id]:
+                latest[key_id] = used_at
+        if not latest:
+            continue
+        with app.app_context():
+            try:
+                # ORM bulk UPDATE by primary key: a single executemany
+                db.session.execute(db.update(APIKey), [
+                    {'id': key_id, 'last_used_at': used_at}
+                    for key_id, used_at in latest.items()
+                ])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Failed to record API key usage: {str(e)}")
+            finally:
+                db.session.remove()
 
 class APIKey(db.Model):
     """API Key model for user authentication."""
     __tablename__ = 'api_keys'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     key = db.Column(db.String(255), unique=True, nullable=False, index=True)
     permissions = db.Column(db.String(20), default='read', nullable=False)  # read, read_write, admin
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     last_used_at = db.Column(db.DateTime, nullable=True)
     expires_at = db.Column(db.DateTime, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                           server_default=db.func.now(), nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                           server_default=db.func.now(), onupdate=lambda: datetime.now(timezone.utc),
+                           nullable=False)
     
     # Relationships
-    user = db.relationship('User', backref=db.backref('api_keys', lazy=True, cascade='all, delete-orphan'))
-    
-    def __init__(self, **kwargs):
-        """Initialize API key with default values."""
-        super(APIKey, self).__init__(**kwargs)
-        if not self.created_at:
-            self.created_at = datetime.utcnow()
-        self.updated_at = self.created_at
+    user = db.relationship('User', back_populates='api_keys')
     
     def __repr__(self):
         """String representation of the API key."""
@@ -45,18 +101,27 @@ class APIKey(db.Model):
             'updated_at': self.updated_at.isoformat()
         }
     
-    @property
+    @hybrid_property
     def is_expired(self):
         """Check if the API key has expired."""
         if self.expires_at is None:
             return False
         return datetime.utcnow() > self.expires_at
     
-    @property
+    @is_expired.expression
+    def is_expired(cls):
+        # expires_at holds naive UTC, so compare against utcnow() rather than now()
+        return db.and_(cls.expires_at.isnot(None), cls.expires_at < datetime.utcnow())
+    
+    @hybrid_property
     def is_valid(self):
         """Check if the API key is valid (active and not expired)."""
         return self.is_active and not self.is_expired
     
+    @is_valid.expression
+    def is_valid(cls):
+        return db.and_(cls.is_active.is_(True), db.not_(cls.is_expired))
+    
     def has_permission(self, required_permission):
         """Check if the API key has the required permission."""
         if self.permissions == 'admin':
@@ -71,20 +136,59 @@ class APIKey(db.Model):
         return False
     
     def update_last_used(self):
-        """Update the last used timestamp."""
-        self.last_used_at = datetime.utcnow()
-        db.session.commit()
+        """Record a use of the key, at most once per LAST_USED_RESOLUTION.
+        
+        The write is queued for the background flusher; the request's own
+        session is left clean.
+        """
+        global _last_used_worker
+        now = datetime.utcnow()
+        if self.last_used_at and now - self.last_used_at < LAST_USED_RESOLUTION:
+            return
+        with _last_used_worker_lock:
+            if _last_used_worker is None:
+                _last_used_worker = threading.Thread(target=_last_used_worker_loop,
+                                                     args=(current_app._get_current_object(),),
+                                                     name='api-key-last-used', daemon=True)
+                _last_used_worker.start()
+        _last_used_queue.put_nowait((self.id, now))
+        set_committed_value(self, 'last_used_at', now)
+        cache_key = _cache_key(self.key)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            cached['last_used_at'] = now
+            cache.set(cache_key, cached, timeout=KEY_CACHE_TIMEOUT)
     
     def revoke(self):
         """Revoke the API key."""
         self.is_active = False
-        self.updated_at = datetime.utcnow()
         db.session.commit()
     
     @classmethod
     def get_by_key(cls, key):
-        """Get API key by its value."""
-        return cls.query.filter_by(key=key, is_active=True).first()
+        """Get API key by its value.
+        
+        Hits are rebuilt from cached column values plus ``key`` itself and
+        attached to the current session without a SELECT.
+        """
+        cache_key = _cache_key(key)
+        values = cache.get(cache_key)
+        
+        if values is None:
+            api_key = cls.query.filter(cls.key == key, cls.is_valid).first()
+            if api_key is not None:
+                cache.set(cache_key, {column.key: getattr(api_key, column.key)
+                                      for column in cls.__table__.columns
+                                      if column.key != 'key'},
+                          timeout=KEY_CACHE_TIMEOUT)
+            return api_key
+        
+        api_key = cls(key=key, **values)
+        if api_key.is_expired:
+            cache.delete(cache_key)
+            return None
+        make_transient_to_detached(api_key)
+        return db.session.merge(api_key, load=False)
     
     @classmethod
     def get_user_keys(cls, user_id):
@@ -112,3 +216,11 @@ class APIKey(db.Model):
         db.session.commit()
         
         return key
+
+
+@event.listens_for(APIKey, 'after_update')
+@event.listens_for(APIKey, 'after_delete')
+def _evict_cached_key(mapper, connection, target):
+    """Drop a changed or deleted key from the shared cache once committed."""
+    cache_key = _cache_key(target.key)
+    call_after_commit(object_session(target), lambda: cache.delete(cache_key))
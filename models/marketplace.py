@@ -1,5 +1,6 @@
 """Marketplace and credentials models."""
 from datetime import datetime
+from sqlalchemy.dialects.postgresql import JSONB
 from .. import db
 
 class Marketplace(db.Model):
@@ -17,8 +18,8 @@ class Marketplace(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    credentials = db.relationship('MarketplaceCredentials', backref='marketplace', lazy='dynamic')
-    price_history = db.relationship('ProductPriceHistory', backref='marketplace', lazy='dynamic')
+    credentials = db.relationship('MarketplaceCredentials', back_populates='marketplace', lazy='selectin')
+    price_history = db.relationship('ProductPriceHistory', back_populates='marketplace', lazy='dynamic')
     
     def __repr__(self):
         return f'<Marketplace {self.name}>'
@@ -27,6 +28,11 @@ class Marketplace(db.Model):
 class MarketplaceCredentials(db.Model):
     """API credentials for marketplaces."""
     __tablename__ = 'marketplace_credentials'
+    __table_args__ = (
+        # Serves containment lookups (extra @> '{...}') on PostgreSQL
+        db.Index('ix_mp_cred_extra_gin', 'metadata', postgresql_using='gin',
+                 postgresql_ops={'metadata': 'jsonb_path_ops'}).ddl_if(dialect='postgresql'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     marketplace_id = db.Column(db.Integer, db.ForeignKey('marketplace.id'), nullable=False)
@@ -40,8 +46,9 @@ class MarketplaceCredentials(db.Model):
     seller_id = db.Column(db.String(100))
     marketplace_id_code = db.Column(db.String(100))  # e.g., Amazon's Merchant ID
     
-    # Additional metadata as JSON
-    metadata = db.Column(db.JSON)
+    # Additional metadata as JSON. The attribute can't be called ``metadata``
+    # (declarative reserves it); the column keeps its original name.
+    extra = db.Column('metadata', db.JSON().with_variant(JSONB, 'postgresql'))
     
     # Status
     is_valid = db.Column(db.Boolean, default=True)
@@ -49,6 +56,9 @@ class MarketplaceCredentials(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Relationships
+    marketplace = db.relationship('Marketplace', back_populates='credentials', lazy='selectin')
+    
     def to_dict(self, include_sensitive=False):
         """Convert to dictionary, optionally including sensitive data."""
         data = {
@@ -66,7 +76,7 @@ class MarketplaceCredentials(db.Model):
                 'api_key': self.api_key,
                 'seller_id': self.seller_id,
                 'marketplace_id_code': self.marketplace_id_code,
-                'metadata': self.metadata
+                'extra': self.extra
             })
         
         return data
@@ -1,9 +1,9 @@
 """Notification model for user alerts and messages."""
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
 from .. import db
 
-class NotificationType(Enum):
+class NotificationType(str, Enum):
     """Types of notifications."""
     INFO = 'info'
     SUCCESS = 'success'
@@ -13,16 +13,29 @@ class NotificationType(Enum):
     ALERT = 'alert'
     SYSTEM = 'system'
 
-class NotificationStatus(Enum):
+class NotificationStatus(str, Enum):
     """Status of a notification."""
     UNREAD = 'unread'
     READ = 'read'
     ARCHIVED = 'archived'
     DELETED = 'deleted'
 
+def _in_check(column, enum):
+    values = ', '.join(f"'{member.value}'" for member in enum)
+    return db.CheckConstraint(f'{column} IN ({values})', name=f'ck_notification_{column}')
+
 class Notification(db.Model):
     """User notification model."""
     __tablename__ = 'notification'
+    __table_args__ = (
+        # Serves per-user status filters, bulk mark-as-read updates and the
+        # newest-first listings (PostgreSQL scans the index backwards)
+        db.Index('ix_notification_user_status_created', 'user_id', 'status', 'created_at'),
+        # Unfiltered ("all") listings and the dashboard's latest five
+        db.Index('ix_notification_user_created', 'user_id', 'created_at'),
+        _in_check('notification_type', NotificationType),
+        _in_check('status', NotificationStatus),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
@@ -30,7 +43,7 @@ class Notification(db.Model):
     # Notification content
     title = db.Column(db.String(255), nullable=False)
     message = db.Column(db.Text, nullable=False)
-    notification_type = db.Column(db.Enum(NotificationType), default=NotificationType.INFO, nullable=False)
+    notification_type = db.Column(db.String(16), default=NotificationType.INFO.value, nullable=False)
     
     # Action/Reference
     action_url = db.Column(db.String(512))
@@ -38,35 +51,49 @@ class Notification(db.Model):
     reference_id = db.Column(db.Integer)  # ID of the referenced item
     
     # Status
-    status = db.Column(db.Enum(NotificationStatus), default=NotificationStatus.UNREAD, index=True)
+    status = db.Column(db.String(16), default=NotificationStatus.UNREAD.value, nullable=False, index=True)
     is_dismissible = db.Column(db.Boolean, default=True)
     
     # Timestamps
-    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # Set in Python so SQLite keeps microseconds, like the keyset cursor does;
+    # the server default only covers rows written outside the ORM
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                           server_default=db.func.now(), nullable=False, index=True)
     read_at = db.Column(db.DateTime)
     expires_at = db.Column(db.DateTime)
     
     # Relationships
-    user = db.relationship('User', back_populates='notifications')
+    user = db.relationship('User', back_populates='notifications', lazy='selectin')
+    
+    @db.validates('notification_type')
+    def _validate_type(self, key, value):
+        return NotificationType(value).value
     
-    def mark_as_read(self, commit=True):
-        """Mark notification as read."""
-        if self.status != NotificationStatus.READ:
-            self.status = NotificationStatus.READ
+    @db.validates('status')
+    def _validate_status(self, key, value):
+        return NotificationStatus(value).value
+    
+    def mark_as_read(self, session=None):
+        """Mark notification as read.
+        
+        Only stages the change; the caller commits it along with anything
+        else the request modified.
+        """
+        if self.status != NotificationStatus.READ.value:
+            self.status = NotificationStatus.READ.value
             self.read_at = datetime.utcnow()
-            if commit and db.session:
-                db.session.commit()
+            (session or db.session).add(self)
     
     def mark_as_unread(self, commit=True):
         """Mark notification as unread."""
-        self.status = NotificationStatus.UNREAD
+        self.status = NotificationStatus.UNREAD.value
         self.read_at = None
         if commit and db.session:
             db.session.commit()
     
     def archive(self, commit=True):
         """Archive the notification."""
-        self.status = NotificationStatus.ARCHIVED
+        self.status = NotificationStatus.ARCHIVED.value
         if commit and db.session:
             db.session.commit()
     
@@ -76,8 +103,8 @@ class Notification(db.Model):
             'id': self.id,
             'title': self.title,
             'message': self.message,
-            'type': self.notification_type.value,
-            'status': self.status.value,
+            'type': self.notification_type,
+            'status': self.status,
             'is_dismissible': self.is_dismissible,
             'action_url': self.action_url,
             'reference_type': self.reference_type,
@@ -90,20 +117,40 @@ class Notification(db.Model):
     @classmethod
     def create_opportunity_notification(cls, user_id, opportunity, message=None, title=None):
         """Create a notification for a new arbitrage opportunity."""
+        return cls(**cls._opportunity_values(user_id, opportunity, message, title))
+    
+    @classmethod
+    def bulk_create_opportunity_notifications(cls, pairs):
+        """Insert one notification per ``(user_id, opportunity)`` pair."""
+        cls.bulk_create([cls._opportunity_values(user_id, opportunity)
+                         for user_id, opportunity in pairs])
+    
+    @classmethod
+    def bulk_create(cls, rows):
+        """Insert many notifications from column dicts in one executemany.
+        
+        Skips the unit of work (and so the ``@validates`` hooks); rows must
+        carry plain string ``status``/``notification_type`` values.
+        """
+        if rows:
+            db.session.execute(db.insert(cls), rows)
+    
+    @staticmethod
+    def _opportunity_values(user_id, opportunity, message=None, title=None):
         if not message:
             message = f"New arbitrage opportunity found with {opportunity.profit_margin:.2f}% margin"
         if not title:
             title = "New Arbitrage Opportunity"
-            
-        return cls(
-            user_id=user_id,
-            title=title,
-            message=message,
-            notification_type=NotificationType.OPPORTUNITY,
-            reference_type='opportunity',
-            reference_id=opportunity.id,
-            action_url=f"/opportunities/{opportunity.id}"
-        )
+        
+        return {
+            'user_id': user_id,
+            'title': title,
+            'message': message,
+            'notification_type': NotificationType.OPPORTUNITY.value,
+            'reference_type': 'opportunity',
+            'reference_id': opportunity.id,
+            'action_url': f"/opportunities/{opportunity.id}"
+        }
     
     @classmethod
     def create_alert_triggered_notification(cls, user_id, alert, opportunity, message=None, title=None):
@@ -118,7 +165,7 @@ class Notification(db.Model):
             user_id=user_id,
             title=title,
             message=message,
-            notification_type=NotificationType.ALERT,
+            notification_type=NotificationType.ALERT.value,
             reference_type='alert',
             reference_id=alert.id,
             action_url=f"/alerts/{alert.id}"
@@ -1,11 +1,22 @@
 """Arbitrage opportunity and alert models."""
 from datetime import datetime
 from decimal import Decimal
+from sqlalchemy import DDL, event
 from .. import db
 
 class ArbitrageOpportunity(db.Model):
     """Arbitrage opportunity between two marketplaces."""
     __tablename__ = 'arbitrage_opportunity'
+    __table_args__ = (
+        # Newest-first listings per user become a backward index range scan
+        db.Index('ix_opportunity_user_created', 'user_id', 'created_at'),
+        # Same for the status-filtered /opportunities listing
+        db.Index('ix_opportunity_user_status_created', 'user_id', 'status', 'created_at'),
+        # Dashboard 7-day profit: an index-only scan over completed rows
+        db.Index('ix_opportunity_completed_user_updated', 'user_id', 'updated_at',
+                 postgresql_include=['profit'],
+                 postgresql_where=db.text("status = 'completed'")).ddl_if(dialect='postgresql'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -15,13 +26,13 @@ class ArbitrageOpportunity(db.Model):
     source_marketplace_id = db.Column(db.Integer, db.ForeignKey('marketplace.id'), nullable=False)
     target_marketplace_id = db.Column(db.Integer, db.ForeignKey('marketplace.id'), nullable=False)
     
-    # Price information
-    source_price = db.Column(db.Numeric(10, 2), nullable=False)
-    target_price = db.Column(db.Numeric(10, 2), nullable=False)
-    shipping_cost = db.Column(db.Numeric(10, 2), default=0)
-    fees = db.Column(db.Numeric(10, 2), default=0)
-    profit = db.Column(db.Numeric(10, 2), nullable=False)
-    profit_margin = db.Column(db.Numeric(5, 2), nullable=False)  # percentage
+    # Price information; display-only, so loaded as float rather than Decimal
+    source_price = db.Column(db.Numeric(10, 2, asdecimal=False), nullable=False)
+    target_price = db.Column(db.Numeric(10, 2, asdecimal=False), nullable=False)
+    shipping_cost = db.Column(db.Numeric(10, 2, asdecimal=False), default=0)
+    fees = db.Column(db.Numeric(10, 2, asdecimal=False), default=0)
+    profit = db.Column(db.Numeric(10, 2, asdecimal=False), nullable=False)
+    profit_margin = db.Column(db.Numeric(5, 2, asdecimal=False), nullable=False)  # percentage
     
     # Status and metadata
     status = db.Column(db.String(50), default='active', index=True)  # active, expired, executed, cancelled
@@ -34,8 +45,12 @@ class ArbitrageOpportunity(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    source_marketplace = db.relationship('Marketplace', foreign_keys=[source_marketplace_id])
-    target_marketplace = db.relationship('Marketplace', foreign_keys=[target_marketplace_id])
+    user = db.relationship('User', back_populates='opportunities')
+    # Many-to-one, so joining them in never multiplies rows
+    product = db.relationship('Product', back_populates='opportunities', lazy='joined')
+    source_marketplace = db.relationship('Marketplace', foreign_keys=[source_marketplace_id], lazy='joined')
+    target_marketplace = db.relationship('Marketplace', foreign_keys=[target_marketplace_id], lazy='joined')
+    alerts = db.relationship('OpportunityAlert', back_populates='opportunity')
     
     def calculate_profitability(self):
         """Calculate and update profit and profit margin."""
@@ -44,8 +59,40 @@ class ArbitrageOpportunity(db.Model):
         self.profit_margin = (float(self.profit) / float(self.target_price)) * 100 if self.target_price > 0 else 0
         return self.profit, self.profit_margin
     
+    @classmethod
+    def bulk_create(cls, rows, chunk_size=1000):
+        """Insert opportunity dicts in chunked multi-row INSERTs and return the new instances."""
+        created = []
+        # Chunks keep each statement well under the driver's bind parameter limit
+        for start in range(0, len(rows), chunk_size):
+            created.extend(db.session.scalars(
+                db.insert(cls).returning(cls),
+                rows[start:start + chunk_size]
+            ).all())
+        return created
+    
+    @classmethod
+    def recompute_bulk(cls, ids):
+        """Recalculate profit and profit margin for many opportunities in one UPDATE."""
+        if not ids:
+            return 0
+        # SET expressions see the pre-update row, so spell profit out again for the margin
+        profit = (cls.target_price - cls.source_price
+                  - db.func.coalesce(cls.shipping_cost, 0) - db.func.coalesce(cls.fees, 0))
+        result = db.session.execute(
+            db.update(cls)
+            .where(cls.id.in_(ids))
+            .values(
+                profit=profit,
+                profit_margin=db.case((cls.target_price > 0, profit / cls.target_price * 100), else_=0)
+            )
+        )
+        return result.rowcount
+    
     def to_dict(self):
         """Convert to dictionary for JSON serialization."""
+        # The columns load as float already, so float() is nearly free; it
+        # keeps the API contract (whole SQLite values as floats, zero as None)
         return {
             'id': self.id,
             'product_id': self.product_id,
@@ -97,7 +144,7 @@ class OpportunityAlert(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    opportunity = db.relationship('ArbitrageOpportunity', backref='alerts')
+    opportunity = db.relationship('ArbitrageOpportunity', back_populates='alerts')
     
     def should_trigger(self, opportunity):
         """Check if the alert should trigger for the given opportunity."""
@@ -134,3 +181,33 @@ class OpportunityAlert(db.Model):
     
     def __repr__(self):
         return f'<OpportunityAlert {self.id} for Opportunity {self.opportunity_id}>'
+
+
+# Per-user dashboard counters, precomputed on PostgreSQL. Not part of the ORM
+# metadata (create_all must not create it as a table); the DDL below creates
+# it with the opportunity table and `flask refresh-dashboard-stats` refreshes it.
+user_dashboard_stats = db.table(
+    'mv_user_dashboard_stats',
+    db.column('user_id'),
+    db.column('active_count'),
+    db.column('profit_7d'),
+)
+
+event.listen(
+    ArbitrageOpportunity.__table__, 'after_create',
+    DDL("""
+        CREATE MATERIALIZED VIEW IF NOT EXISTS mv_user_dashboard_stats AS
+        SELECT user_id,
+               count(*) FILTER (WHERE status = 'active') AS active_count,
+               sum(profit) FILTER (WHERE status = 'completed'
+                                   AND updated_at >= now() - interval '7 days') AS profit_7d
+        FROM arbitrage_opportunity
+        GROUP BY user_id;
+        CREATE UNIQUE INDEX IF NOT EXISTS ix_mv_user_dashboard_stats_user
+            ON mv_user_dashboard_stats (user_id)
+    """).execute_if(dialect='postgresql')
+)
+event.listen(
+    ArbitrageOpportunity.__table__, 'before_drop',
+    DDL('DROP MATERIALIZED VIEW IF EXISTS mv_user_dashboard_stats').execute_if(dialect='postgresql')
+)
@@ -1,13 +1,25 @@
 """Product and price history models."""
-from datetime import datetime
+from datetime import datetime, timedelta
 from .. import db
 
 class Product(db.Model):
     """Product model for tracking items across marketplaces."""
     __tablename__ = 'product'
+    __table_args__ = (
+        # Trigram index lets PostgreSQL serve ILIKE '%term%' product searches
+        db.Index('ix_product_name_trgm', 'name', postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        # CSV imports match rows to products by the marketplace's own ID
+        db.Index('ix_product_marketplace_external', 'marketplace_id', 'external_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), index=True)
     name = db.Column(db.String(255), nullable=False)
+    # Listing the product was imported from, if any
+    marketplace_id = db.Column(db.Integer, db.ForeignKey('marketplace.id'))
+    external_id = db.Column(db.String(100))
+    url = db.Column(db.String(512))
     upc = db.Column(db.String(12), unique=True, index=True)
     ean = db.Column(db.String(13), unique=True, index=True)
     asin = db.Column(db.String(10), unique=True, index=True)
@@ -23,26 +35,38 @@ class Product(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    prices = db.relationship('ProductPriceHistory', backref='product', lazy='dynamic')
-    opportunities = db.relationship('ArbitrageOpportunity', backref='product', lazy='dynamic')
+    owner = db.relationship('User', back_populates='products')
+    # Full histories are large, so prices is never eager-loaded; lists get
+    # the newest row through latest_price (declared in models/__init__.py)
+    prices = db.relationship('ProductPriceHistory', back_populates='product',
+                             order_by='ProductPriceHistory.timestamp.desc()')
+    opportunities = db.relationship('ArbitrageOpportunity', back_populates='product')
     
     def current_price(self, marketplace_id=None):
         """Get the current price for this product, optionally filtered by marketplace."""
-        query = self.prices.order_by(ProductPriceHistory.timestamp.desc())
         if marketplace_id:
-            query = query.filter_by(marketplace_id=marketplace_id)
-        return query.first()
+            return self.current_price_for(marketplace_id)
+        return self.latest_price
+    
+    def current_price_for(self, marketplace_id):
+        """Get the newest price for this product on one marketplace."""
+        return (ProductPriceHistory.query
+                .filter_by(product_id=self.id, marketplace_id=marketplace_id)
+                .order_by(ProductPriceHistory.timestamp.desc())
+                .first())
     
     def price_history(self, days=30, marketplace_id=None):
         """Get price history for this product."""
-        cutoff = datetime.utcnow() - datetime.timedelta(days=days)
-        query = self.prices.filter(ProductPriceHistory.timestamp >= cutoff)
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        query = ProductPriceHistory.query.filter(ProductPriceHistory.product_id == self.id,
+                                                 ProductPriceHistory.timestamp >= cutoff)
         if marketplace_id:
             query = query.filter_by(marketplace_id=marketplace_id)
         return query.order_by(ProductPriceHistory.timestamp).all()
     
     def to_dict(self):
         """Convert to dictionary for JSON serialization."""
+        current_price = self.current_price()
         return {
             'id': self.id,
             'name': self.name,
@@ -50,7 +74,7 @@ class Product(db.Model):
             'brand': self.brand,
             'category': self.category,
             'image_url': self.image_url,
-            'current_price': self.current_price().to_dict() if self.current_price() else None,
+            'current_price': current_price.to_dict() if current_price else None,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
@@ -62,20 +86,31 @@ class Product(db.Model):
 class ProductPriceHistory(db.Model):
     """Historical price data for products."""
     __tablename__ = 'product_price_history'
+    __table_args__ = (
+        db.Index('ix_pph_marketplace_product', 'marketplace_id', 'product_id'),
+        # current_price_for() and marketplace-filtered price_history(): an
+        # index seek, newest first via a backward scan
+        db.Index('ix_pph_prod_mkt_ts', 'product_id', 'marketplace_id', 'timestamp'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     marketplace_id = db.Column(db.Integer, db.ForeignKey('marketplace.id'), nullable=False)
-    price = db.Column(db.Numeric(10, 2), nullable=False)
+    # Loaded as float; these are only displayed and charted
+    price = db.Column(db.Numeric(10, 2, asdecimal=False), nullable=False)
     currency = db.Column(db.String(3), default='USD')
     in_stock = db.Column(db.Boolean, default=True)
     stock_quantity = db.Column(db.Integer)
     buy_box_winner = db.Column(db.Boolean, default=False)
     seller_id = db.Column(db.String(100))
     seller_name = db.Column(db.String(255))
-    shipping_cost = db.Column(db.Numeric(10, 2))
+    shipping_cost = db.Column(db.Numeric(10, 2, asdecimal=False))
     condition = db.Column(db.String(50))  # new, used, refurbished, etc.
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    product = db.relationship('Product', back_populates='prices')
+    marketplace = db.relationship('Marketplace', back_populates='price_history')
     
     def to_dict(self):
         """Convert to dictionary for JSON serialization."""
@@ -95,3 +130,4 @@ class ProductPriceHistory(db.Model):
     
     def __repr__(self):
         return f'<ProductPriceHistory {self.product_id} @ {self.price} {self.currency}>'
+
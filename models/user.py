@@ -1,9 +1,16 @@
 """User and role models for authentication and authorization."""
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from functools import cached_property
+from sqlalchemy import event
+from werkzeug.security import check_password_hash
+from passlib.hash import argon2
 from flask_login import UserMixin
 from flask_security import RoleMixin
-from .. import db
+from .. import db, login_manager
+
+# argon2id via argon2-cffi; werkzeug hashes from before the switch are upgraded on login
+password_hasher = argon2.using(rounds=3, memory_cost=65536, parallelism=2)
+LEGACY_HASH_PREFIXES = ('pbkdf2:', 'scrypt:')
 
 # Association table for many-to-many relationship between users and roles
 roles_users = db.Table(
@@ -20,12 +27,21 @@ class Role(db.Model, RoleMixin):
     name = db.Column(db.String(80), unique=True)
     description = db.Column(db.String(255))
     
+    users = db.relationship('User', secondary=roles_users, back_populates='roles', lazy='dynamic')
+    
     def __str__(self):
         return self.name
 
 class User(db.Model, UserMixin):
     """User account model."""
     __tablename__ = 'user'
+    __table_args__ = (
+        # Trigram indexes let PostgreSQL serve ILIKE '%term%' admin searches
+        db.Index('ix_user_username_trgm', 'username', postgresql_using='gin',
+                 postgresql_ops={'username': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+        db.Index('ix_user_email_trgm', 'email', postgresql_using='gin',
+                 postgresql_ops={'email': 'gin_trgm_ops'}).ddl_if(dialect='postgresql'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
@@ -42,11 +58,15 @@ class User(db.Model, UserMixin):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    roles = db.relationship('Role', secondary=roles_users,
-                           backref=db.backref('users', lazy='dynamic'))
-    products = db.relationship('Product', backref='owner', lazy='dynamic')
-    opportunities = db.relationship('ArbitrageOpportunity', backref='user', lazy='dynamic')
-    notifications = db.relationship('Notification', backref='user', lazy='dynamic')
+    # The per-user collections are unbounded, so they stay dynamic (queries)
+    # Checked on most requests, so loaded together with the user
+    roles = db.relationship('Role', secondary=roles_users, back_populates='users', lazy='joined')
+    products = db.relationship('Product', back_populates='owner', lazy='dynamic')
+    opportunities = db.relationship('ArbitrageOpportunity', back_populates='user', lazy='dynamic')
+    notifications = db.relationship('Notification', back_populates='user', lazy='dynamic')
+    api_keys = db.relationship('APIKey', back_populates='user', cascade='all, delete-orphan',
+                               order_by='APIKey.created_at.desc()')
+    activities = db.relationship('ActivityLog', back_populates='user')
     
     def __init__(self, email, username, password):
         self.email = email.lower()
@@ -59,21 +79,52 @@ class User(db.Model, UserMixin):
     
     @password.setter
     def password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def verify_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        if self.password_hash.startswith(LEGACY_HASH_PREFIXES):
+            if not check_password_hash(self.password_hash, password):
+                return False
+        elif not password_hasher.verify(password, self.password_hash):
+            return False
+        
+        # Rehash legacy or outdated-parameter hashes; the login view commits it
+        if self.password_hash.startswith(LEGACY_HASH_PREFIXES) or password_hasher.needs_update(self.password_hash):
+            self.password = password
+        return True
+    
+    # The auth and API views call it by this name
+    check_password = verify_password
+    
+    @cached_property
+    def role_names(self):
+        """Names of this user's roles, resolved once per instance (i.e. per request)."""
+        return frozenset(role.name for role in self.roles)
     
     def has_role(self, role_name):
-        return role_name in [role.name for role in self.roles]
+        return role_name in self.role_names
     
     def get_security_payload(self):
         return {
             'id': self.id,
             'email': self.email,
             'username': self.username,
-            'roles': [role.name for role in self.roles]
+            'roles': sorted(self.role_names)
         }
     
     def __repr__(self):
         return f'<User {self.username}>'
+
+
+@event.listens_for(User.roles, 'append')
+@event.listens_for(User.roles, 'remove')
+@event.listens_for(User.roles, 'bulk_replace')
+def _invalidate_role_names(user, *args):
+    """Drop the memoized role names whenever the roles collection changes."""
+    user.__dict__.pop('role_names', None)
+
+
+@login_manager.user_loader
+def load_user(user_id):
+    """Flask-Login user loader; uses the identity map before querying."""
+    return db.session.get(User, int(user_id))
@@ -3,7 +3,7 @@ from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, F
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship, scoped_session
 from sqlalchemy.sql import func
 import os
-from dotenv import load_dotenv
+from config._env import ensure_env_loaded
 import logging
 
 # Set up logging
@@ -14,7 +14,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Load environment variables
-load_dotenv()
+ensure_env_loaded()
 
 # Database connection URL
 DATABASE_URL = os.getenv('DATABASE_URL')
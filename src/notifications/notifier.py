@@ -5,10 +5,10 @@ from email.mime.multipart import MIMEMultipart
 from typing import List, Dict, Optional, Union
 from datetime import datetime
 import os
-from dotenv import load_dotenv
+from config._env import ensure_env_loaded
 
 # Load environment variables
-load_dotenv()
+ensure_env_loaded()
 
 # Set up logging
 logging.basicConfig(
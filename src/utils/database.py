@@ -10,10 +10,10 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, scoped_session, Session, declarative_base, relationship
 from sqlalchemy.sql import func
 import os
-from dotenv import load_dotenv
+from config._env import ensure_env_loaded
 
 # Load environment variables
-load_dotenv()
+ensure_env_loaded()
 
 # Set up logging
 logging.basicConfig(
@@ -5,6 +5,8 @@ from datetime import datetime, timedelta
 from .. import create_app, db
 from ..models import Product, Marketplace, ArbitrageOpportunity, Notification, User, ActivityLog
 from ..utils import log_activity
+from ..main import invalidate_dashboard_counts
+from ..admin import invalidate_dashboard_stats
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -151,7 +153,14 @@ class PriceScraper(BackgroundTask):
         if not other_marketplaces:
             return
         
+        # One query for the opportunities this product already has, keyed by target
+        existing = {
+            opportunity.target_marketplace_id: opportunity
+            for opportunity in ArbitrageOpportunity.query.filter_by(product_id=product.id)
+        }
+        
         opportunities = []
+        new_rows = []
         
         for target_marketplace in other_marketplaces:
             try:
@@ -193,27 +202,23 @@ class PriceScraper(BackgroundTask):
                 
                 if profit_info['profit'] > 0 and profit_info['profit_margin'] > 0:
                     # Create or update arbitrage opportunity
-                    opportunity = ArbitrageOpportunity.query.filter_by(
-                        source_product_id=product.id,
-                        target_marketplace_id=target_marketplace.id
-                    ).first()
+                    opportunity = existing.get(target_marketplace.id)
                     
                     if not opportunity:
-                        opportunity = ArbitrageOpportunity(
-                            user_id=product.owner_id,
-                            source_product_id=product.id,
-                            source_marketplace_id=product.marketplace_id,
-                            target_marketplace_id=target_marketplace.id,
-                            status='active',
-                            profit=profit_info['profit'],
-                            profit_margin=profit_info['profit_margin'],
-                            source_price=source_price,
-                            target_price=target_price,
-                            shipping_cost=shipping,
-                            fees=fees,
-                            target_url=target_product.get('url')
-                        )
-                        db.session.add(opportunity)
+                        # Queued for a batched INSERT below
+                        new_rows.append({
+                            'user_id': product.owner_id,
+                            'product_id': product.id,
+                            'source_marketplace_id': product.marketplace_id,
+                            'target_marketplace_id': target_marketplace.id,
+                            'status': 'active',
+                            'profit': profit_info['profit'],
+                            'profit_margin': profit_info['profit_margin'],
+                            'source_price': source_price,
+                            'target_price': target_price,
+                            'shipping_cost': shipping,
+                            'fees': fees
+                        })
                     else:
                         opportunity.profit = profit_info['profit']
                         opportunity.profit_margin = profit_info['profit_margin']
@@ -226,15 +231,22 @@ class PriceScraper(BackgroundTask):
                         # If the opportunity was previously expired, reactivate it
                         if opportunity.status == 'expired':
                             opportunity.status = 'active'
-                    
-                    opportunities.append(opportunity)
+                        
+                        opportunities.append(opportunity)
                     
             except Exception as e:
                 logger.error(f"Error checking arbitrage opportunity for product {product.id} on {target_marketplace.name}: {str(e)}")
                 continue
         
-        if opportunities:
+        if opportunities or new_rows:
             try:
+                opportunities.extend(ArbitrageOpportunity.bulk_create(new_rows))
+                db.session.flush()
+                ArbitrageOpportunity.recompute_bulk([opportunity.id for opportunity in opportunities])
+                if new_rows:
+                    # Bulk INSERTs bypass the mapper events that keep the dashboards fresh
+                    invalidate_dashboard_counts(product.owner_id)
+                    invalidate_dashboard_stats()
                 db.session.commit()
                 self.notify_opportunities(opportunities)
             except Exception as e:
@@ -272,23 +284,22 @@ class PriceScraper(BackgroundTask):
         """Send notifications for new or updated arbitrage opportunities."""
         from ..models import Notification
         
+        rows = []
         for opportunity in opportunities:
             # Skip if this is just an update to an existing opportunity
             if opportunity.updated_at and (datetime.utcnow() - opportunity.updated_at).total_seconds() < 3600:
                 continue
             
-            # Create notification for the user
-            notification = Notification(
-                user_id=opportunity.user_id,
-                title="New Arbitrage Opportunity",
-                message=f"Found a potential profit of ${opportunity.profit:.2f} ({opportunity.profit_margin:.1f}%) on {opportunity.target_marketplace.name}",
-                notification_type='opportunity',
-                reference_id=opportunity.id,
-                reference_type='arbitrage_opportunity',
-                status='unread'
-            )
-            
-            db.session.add(notification)
+            # Queue a notification for the user; all rows go in one INSERT below
+            rows.append({
+                'user_id': opportunity.user_id,
+                'title': "New Arbitrage Opportunity",
+                'message': f"Found a potential profit of ${opportunity.profit:.2f} ({opportunity.profit_margin:.1f}%) on {opportunity.target_marketplace.name}",
+                'notification_type': 'opportunity',
+                'reference_id': opportunity.id,
+                'reference_type': 'arbitrage_opportunity',
+                'status': 'unread'
+            })
             
             # Log the activity
             log_activity(
@@ -304,6 +315,7 @@ class PriceScraper(BackgroundTask):
             )
         
         try:
+            Notification.bulk_create(rows)
             db.session.commit()
         except Exception as e:
             logger.error(f"Error creating notifications: {str(e)}")
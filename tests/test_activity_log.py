@@ -0,0 +1,86 @@
+"""
+Tests for the activity log model.
+"""
+
+import unittest
+from datetime import datetime, timezone
+
+import orjson
+from sqlalchemy import inspect
+
+try:
+    import fakeredis
+except ImportError:  # optional; only the stream tests need it
+    fakeredis = None
+
+from helpers import AppTestCase, import_module
+
+class TestActivitySearch(AppTestCase):
+    """search_activities falls back to ILIKE where full-text search is missing."""
+
+    def setUp(self):
+        super().setUp()
+        ActivityLog = import_module('models').ActivityLog
+        self.db.session.add_all([
+            ActivityLog(action='login_success', details={'email': 'alice@example.com'}),
+            ActivityLog(action='product_import', details={'file': 'widgets.csv'}),
+            ActivityLog(action='logout', details=None),
+        ])
+        self.db.session.commit()
+        self.ActivityLog = ActivityLog
+
+    def test_matches_action(self):
+        results = self.ActivityLog.search_activities('login')
+        self.assertEqual([log.action for log in results.items], ['login_success'])
+
+    def test_matches_details(self):
+        results = self.ActivityLog.search_activities('widgets')
+        self.assertEqual([log.action for log in results.items], ['product_import'])
+
+    def test_postgres_only_indexes_are_skipped(self):
+        indexes = {index['name'] for index in inspect(self.db.engine).get_indexes('activity_logs')}
+        self.assertNotIn('ix_activity_action_trgm', indexes)
+        self.assertNotIn('ix_activity_details_tsv', indexes)
+
+@unittest.skipIf(fakeredis is None, 'fakeredis is not installed')
+class TestFlushStream(AppTestCase):
+    """Buffered entries reach the table at least once, whoever read them first."""
+
+    stream = 'activity-log'
+    group = 'activity-log-writers'
+
+    def setUp(self):
+        super().setUp()
+        self.ActivityLog = import_module('models').ActivityLog
+        self.redis = fakeredis.FakeRedis()
+
+    def add(self, action):
+        entry = {'user_id': None, 'action': action, 'details': None, 'ip_address': None,
+                 'user_agent': None, 'created_at': datetime.now(timezone.utc).isoformat()}
+        self.redis.xadd(self.stream, {'entry': orjson.dumps(entry)})
+
+    def test_entries_left_by_a_crashed_writer_are_claimed(self):
+        self.ActivityLog.flush_stream(self.redis, self.stream)
+        self.add('login')
+        self.add('logout')
+        # Read under the old name and never acknowledged
+        self.redis.xreadgroup(self.group, 'worker-1', {self.stream: '>'})
+
+        written = self.ActivityLog.flush_stream(self.redis, self.stream, consumer='worker-2',
+                                                claim_idle=0)
+
+        self.assertEqual(written, 2)
+        self.assertEqual(sorted(log.action for log in self.ActivityLog.query), ['login', 'logout'])
+        self.assertEqual(self.redis.xpending(self.stream, self.group)['pending'], 0)
+
+    def test_failed_insert_rolls_back_and_stays_pending(self):
+        self.add(None)  # violates NOT NULL on action
+
+        with self.assertRaises(Exception):
+            self.ActivityLog.flush_stream(self.redis, self.stream)
+
+        self.assertEqual(self.ActivityLog.query.count(), 0)
+        self.assertEqual(self.redis.xpending(self.stream, self.group)['pending'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
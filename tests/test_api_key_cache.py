@@ -0,0 +1,98 @@
+"""
+Tests for the API key lookup cache.
+"""
+
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from helpers import AppTestCase, import_module
+
+class TestAPIKeyCache(AppTestCase):
+    """Cached keys skip the database, but never outlive a revocation."""
+
+    def setUp(self):
+        super().setUp()
+        self.api_key = import_module('models.api_key')
+        self.cache = import_module('extensions').cache
+        self.cache.clear()
+        self.user = self.create_user()
+        self.key = self.api_key.APIKey(user_id=self.user.id, name='CI', key='k' * 40)
+        self.db.session.add(self.key)
+        self.db.session.commit()
+        self.cache_key = self.api_key._cache_key('k' * 40)
+
+    def count_queries(self, func):
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(self.db.engine, 'before_cursor_execute', listener)
+        try:
+            result = func()
+        finally:
+            event.remove(self.db.engine, 'before_cursor_execute', listener)
+        return result, statements
+
+    def test_second_lookup_is_served_from_the_cache(self):
+        APIKey = self.api_key.APIKey
+        self.assertEqual(APIKey.get_by_key('k' * 40).id, self.key.id)
+        self.db.session.expunge_all()
+
+        api_key, statements = self.count_queries(lambda: APIKey.get_by_key('k' * 40))
+
+        self.assertEqual(api_key.id, self.key.id)
+        self.assertEqual(statements, [])
+
+    def test_raw_key_is_not_cached(self):
+        self.api_key.APIKey.get_by_key('k' * 40)
+        self.db.session.expunge_all()
+
+        self.assertNotIn('key', self.cache.get(self.cache_key))
+        self.assertEqual(self.api_key.APIKey.get_by_key('k' * 40).key, 'k' * 40)
+
+    def test_revoke_evicts_the_shared_entry(self):
+        APIKey = self.api_key.APIKey
+        APIKey.get_by_key('k' * 40)
+        self.assertIsNotNone(self.cache.get(self.cache_key))
+
+        self.key.revoke()
+
+        self.assertIsNone(self.cache.get(self.cache_key))
+        self.assertIsNone(APIKey.get_by_key('k' * 40))
+
+    def test_delete_evicts_after_commit_only(self):
+        APIKey = self.api_key.APIKey
+        APIKey.get_by_key('k' * 40)
+
+        self.db.session.delete(self.key)
+        self.db.session.flush()
+        self.assertIsNotNone(self.cache.get(self.cache_key))
+
+        self.db.session.commit()
+        self.assertIsNone(self.cache.get(self.cache_key))
+        self.assertIsNone(APIKey.get_by_key('k' * 40))
+
+    def test_rolled_back_change_keeps_the_entry(self):
+        APIKey = self.api_key.APIKey
+        APIKey.get_by_key('k' * 40)
+
+        self.key.is_active = False
+        self.db.session.flush()
+        self.db.session.rollback()
+
+        self.assertIsNotNone(self.cache.get(self.cache_key))
+
+    def test_expired_cached_key_is_rejected(self):
+        APIKey = self.api_key.APIKey
+        self.key.expires_at = datetime.utcnow() + timedelta(seconds=30)
+        self.db.session.commit()
+        APIKey.get_by_key('k' * 40)
+
+        values = self.cache.get(self.cache_key)
+        values['expires_at'] = datetime.utcnow() - timedelta(seconds=1)
+        self.cache.set(self.cache_key, values)
+
+        self.assertIsNone(APIKey.get_by_key('k' * 40))
+
+if __name__ == '__main__':
+    unittest.main()
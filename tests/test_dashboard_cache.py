@@ -0,0 +1,71 @@
+"""
+Tests for invalidation of the cached dashboard counters.
+"""
+
+import unittest
+
+from helpers import AppTestCase, import_module
+
+class TestDashboardCache(AppTestCase):
+    """Counters are evicted when a change commits, not when it is flushed."""
+
+    def setUp(self):
+        super().setUp()
+        import_module('extensions').cache.clear()
+        self.admin = import_module('admin')
+        self.main = import_module('main')
+        self.Product = import_module('models').Product
+        self.user = self.create_user()
+
+    def add_product(self, name):
+        product = self.Product(name=name, owner_id=self.user.id)
+        self.db.session.add(product)
+        return product
+
+    def test_admin_stats_refresh_after_commit(self):
+        self.assertEqual(self.admin._dashboard_stats()['total_products'], 0)
+
+        self.add_product('Widget')
+        self.db.session.commit()
+
+        self.assertEqual(self.admin._dashboard_stats()['total_products'], 1)
+
+    def test_admin_stats_count_active_users(self):
+        self.create_user(email='disabled@example.com', username='disabled').active = False
+        self.db.session.commit()
+
+        stats = self.admin._dashboard_stats()
+
+        self.assertEqual(stats['total_users'], 2)
+        self.assertEqual(stats['active_users'], 1)
+
+    def test_admin_stats_survive_a_rollback(self):
+        self.assertEqual(self.admin._dashboard_stats()['total_products'], 0)
+
+        self.add_product('Widget')
+        self.db.session.flush()
+        # Still the cached value, although this session can see the new row
+        self.assertEqual(self.admin._dashboard_stats()['total_products'], 0)
+        self.db.session.rollback()
+
+        self.assertEqual(self.admin._dashboard_stats()['total_products'], 0)
+
+    def test_user_product_count_refreshes_after_commit(self):
+        self.assertEqual(self.main._dashboard_counts(self.user.id)[0], 0)
+
+        product = self.add_product('Widget')
+        self.db.session.flush()
+        self.assertEqual(self.main._dashboard_counts(self.user.id)[0], 0)
+        self.db.session.commit()
+        self.assertEqual(self.main._dashboard_counts(self.user.id)[0], 1)
+
+        other = self.create_user(email='other@example.com', username='other')
+        self.assertEqual(self.main._dashboard_counts(other.id)[0], 0)
+        product.owner_id = other.id
+        self.db.session.commit()
+
+        self.assertEqual(self.main._dashboard_counts(self.user.id)[0], 0)
+        self.assertEqual(self.main._dashboard_counts(other.id)[0], 1)
+
+if __name__ == '__main__':
+    unittest.main()
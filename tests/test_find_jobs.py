@@ -0,0 +1,56 @@
+"""
+Tests for the background opportunity-scan jobs of the web interface.
+"""
+
+import time
+import unittest
+from unittest.mock import patch
+
+from flask_login import login_user
+
+from helpers import import_web_app
+
+class TestFindJobs(unittest.TestCase):
+    """Job status is shared storage, and only visible to the job's owner."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.web = import_web_app()
+
+    def status(self, job_id, username):
+        with self.web.app.test_request_context():
+            user = self.web.User(username, 'unused')
+            user.is_authenticated = True
+            login_user(user)
+            response = self.web.app.make_response(self.web.task_status(job_id))
+        return response.status_code, response.get_json()
+
+    def submit(self, username, result):
+        with patch.object(self.web, '_find_opportunities_task', return_value=result):
+            job_id = self.web._submit_find_task({}, username)
+            # Poll the shared store, as a status request on any worker would
+            deadline = time.time() + 5
+            while self.status(job_id, username)[1]['status'] == 'pending':
+                self.assertLess(time.time(), deadline, 'job never finished')
+                time.sleep(0.01)
+        return job_id
+
+    def test_owner_sees_finished_results(self):
+        job_id = self.submit('alice', [{'title': 'Widget', 'profit': 12.5}])
+
+        status_code, data = self.status(job_id, 'alice')
+
+        self.assertEqual(status_code, 200)
+        self.assertEqual(data['status'], 'finished')
+        self.assertEqual(data['opportunities'], [{'title': 'Widget', 'profit': 12.5}])
+
+    def test_other_users_get_not_found(self):
+        job_id = self.submit('alice', [{'title': 'Widget', 'profit': 12.5}])
+
+        status_code, data = self.status(job_id, 'mallory')
+
+        self.assertEqual(status_code, 404)
+        self.assertNotIn('opportunities', data)
+
+if __name__ == '__main__':
+    unittest.main()
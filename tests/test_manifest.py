@@ -0,0 +1,78 @@
+"""
+Tests for the saved-opportunities manifest used by the web interface.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import orjson
+
+from helpers import import_web_app
+
+def _opportunity(title, profit):
+    from src.arbitrage_engine import ArbitrageOpportunity
+    return ArbitrageOpportunity(
+        source_product={'title': title, 'price': 10.0},
+        target_platform='ebay',
+        target_price=10.0 + profit,
+        profit=profit,
+        profit_margin=profit * 5,
+        fees={'source_fees': 0.0, 'target_fees': 1.0, 'total_fees': 1.0},
+        timestamp='2024-01-01T00:00:00'
+    )
+
+class TestManifest(unittest.TestCase):
+    """The manifest must list every saved file, including ones it predates."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.web = import_web_app()
+
+    def setUp(self):
+        self.directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        manifest = self.directory / '_index.jsonl'
+        original = self.web.MANIFEST_FILE
+        self.web.MANIFEST_FILE = manifest
+        self.addCleanup(setattr, self.web, 'MANIFEST_FILE', original)
+
+    def save(self, filename, opportunities, mtime):
+        path = self.directory / filename
+        path.write_bytes(orjson.dumps([opp.to_dict() for opp in opportunities]))
+        os.utime(path, (mtime, mtime))
+        return filename
+
+    def test_first_append_indexes_existing_files(self):
+        now = time.time()
+        self.save('opportunities_20240101_000000.json', [_opportunity('Old', 5.0)], now - 200)
+        self.save('opportunities_20240102_000000.json', [_opportunity('Older', 6.0)], now - 300)
+        new = [_opportunity('New', 7.0), _opportunity('New 2', 8.0)]
+        filename = self.save('opportunities_20240103_000000.json', new, now)
+
+        self.web.append_to_manifest(filename, new)
+
+        entries = self.web.read_manifest()
+        self.assertEqual([entry['filename'] for entry in entries], [
+            'opportunities_20240103_000000.json',
+            'opportunities_20240101_000000.json',
+            'opportunities_20240102_000000.json',
+        ])
+        self.assertEqual(entries[0]['count'], 2)
+        self.assertEqual(entries[1]['top3'][0]['source_product']['title'], 'Old')
+
+    def test_append_keeps_existing_entries(self):
+        first = [_opportunity('First', 5.0)]
+        self.web.append_to_manifest(self.save('opportunities_20240101_000000.json', first, time.time()), first)
+        second = [_opportunity('Second', 6.0)]
+        self.web.append_to_manifest(self.save('opportunities_20240102_000000.json', second, time.time()), second)
+
+        self.assertEqual([entry['count'] for entry in self.web.read_manifest()], [1, 1])
+        self.assertEqual(self.web.read_manifest(limit=1)[0]['filename'],
+                         'opportunities_20240102_000000.json')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+"""
+Tests for invalidation of the cached marketplace select choices.
+"""
+
+import unittest
+
+from helpers import AppTestCase, import_module
+
+class TestMarketplaceChoices(AppTestCase):
+    """Choices are evicted when a marketplace change commits, not when it is flushed."""
+
+    def setUp(self):
+        super().setUp()
+        import_module('extensions').cache.clear()
+        import_module('forms')
+        self.get_marketplace_choices = import_module('utils').get_marketplace_choices
+        self.Marketplace = import_module('models').Marketplace
+
+    def test_choices_refresh_after_commit(self):
+        self.assertEqual(self.get_marketplace_choices(), [])
+
+        self.db.session.add(self.Marketplace(name='eBay', code='ebay'))
+        self.db.session.flush()
+        self.assertEqual(self.get_marketplace_choices(), [])
+        self.db.session.commit()
+
+        self.assertEqual([name for _, name in self.get_marketplace_choices()], ['eBay'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+Tests for the notification read endpoints.
+"""
+
+import unittest
+
+from helpers import AppTestCase, import_module
+
+class TestMarkAsRead(AppTestCase):
+    """Marking a notification read is committed by the view itself."""
+
+    def setUp(self):
+        super().setUp()
+        self.Notification = import_module('models').Notification
+        self.user = self.create_user()
+        notification = self.Notification(user_id=self.user.id, title='Hello', message='...')
+        self.db.session.add(notification)
+        self.db.session.commit()
+        self.notification_id = notification.id
+        self.client = self.app.test_client()
+        self.login(self.client, self.user)
+
+    def status(self):
+        # A fresh session, as the next request would see it
+        self.db.session.remove()
+        return self.db.session.get(self.Notification, self.notification_id).status
+
+    def test_api_mark_read_is_committed(self):
+        response = self.client.post(f'/api/v1/notifications/{self.notification_id}/read')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.status(), 'read')
+
+    def test_mark_read_is_committed(self):
+        response = self.client.post(f'/notifications/{self.notification_id}/read', json={})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.status(), 'read')
+
+if __name__ == '__main__':
+    unittest.main()
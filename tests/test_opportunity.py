@@ -0,0 +1,161 @@
+"""
+Tests for the arbitrage opportunity model.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy import event, inspect
+
+from helpers import AppTestCase, import_module
+
+class OpportunityTestCase(AppTestCase):
+    """Provides a user, a product and two marketplaces to hang opportunities on."""
+
+    def setUp(self):
+        super().setUp()
+        models = import_module('models')
+        self.ArbitrageOpportunity = models.ArbitrageOpportunity
+        self.user = self.create_user()
+        self.source = models.Marketplace(name='Amazon', code='amazon')
+        self.target = models.Marketplace(name='eBay', code='ebay')
+        self.product = models.Product(name='Widget', owner_id=self.user.id)
+        self.db.session.add_all([self.source, self.target, self.product])
+        self.db.session.commit()
+
+    def row(self, **values):
+        row = {
+            'user_id': self.user.id,
+            'product_id': self.product.id,
+            'source_marketplace_id': self.source.id,
+            'target_marketplace_id': self.target.id,
+            'status': 'active',
+            'source_price': 10,
+            'target_price': 20,
+            'shipping_cost': 2,
+            'fees': 1,
+            'profit': 0,
+            'profit_margin': 0,
+        }
+        row.update(values)
+        return row
+
+class TestToDict(OpportunityTestCase):
+    """to_dict keeps the response contract of the Decimal-backed columns."""
+
+    def test_prices_serialize_as_floats(self):
+        opportunity = self.ArbitrageOpportunity(**self.row(profit=7, profit_margin=35))
+        self.db.session.add(opportunity)
+        self.db.session.commit()
+        self.db.session.expire_all()
+
+        data = opportunity.to_dict()
+
+        for field in ('source_price', 'target_price', 'shipping_cost', 'fees', 'profit', 'profit_margin'):
+            self.assertIs(type(data[field]), float, field)
+        self.assertEqual(data['profit'], 7.0)
+
+    def test_zero_prices_serialize_as_none(self):
+        opportunity = self.ArbitrageOpportunity(**self.row(shipping_cost=0, fees=0))
+        self.db.session.add(opportunity)
+        self.db.session.commit()
+
+        data = opportunity.to_dict()
+
+        self.assertIsNone(data['shipping_cost'])
+        self.assertIsNone(data['fees'])
+        self.assertEqual(data['profit'], 0.0)
+
+class TestIndexes(OpportunityTestCase):
+    """The partial covering index only exists where it can be partial."""
+
+    def test_postgres_only_indexes_are_skipped(self):
+        indexes = {index['name'] for index in inspect(self.db.engine).get_indexes('arbitrage_opportunity')}
+        self.assertIn('ix_opportunity_user_created', indexes)
+        self.assertNotIn('ix_opportunity_completed_user_updated', indexes)
+
+class TestBulkCreate(OpportunityTestCase):
+    """bulk_create inserts in chunks and hands back persistent instances."""
+
+    def test_rows_are_inserted_in_chunks(self):
+        statements = []
+        def count_inserts(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('INSERT INTO arbitrage_opportunity '):
+                statements.append(statement)
+        event.listen(self.db.engine, 'before_cursor_execute', count_inserts)
+        self.addCleanup(event.remove, self.db.engine, 'before_cursor_execute', count_inserts)
+
+        created = self.ArbitrageOpportunity.bulk_create(
+            [self.row(source_price=price) for price in range(1, 6)], chunk_size=2)
+        self.db.session.commit()
+
+        self.assertEqual(len(statements), 3)
+        self.assertEqual([opportunity.source_price for opportunity in created], [1, 2, 3, 4, 5])
+        self.assertTrue(all(opportunity.id for opportunity in created))
+        self.assertEqual(self.ArbitrageOpportunity.query.count(), 5)
+
+class TestRecomputeBulk(OpportunityTestCase):
+    """recompute_bulk matches the per-row profit calculation."""
+
+    def test_profit_and_margin_are_recomputed(self):
+        created = self.ArbitrageOpportunity.bulk_create([self.row(), self.row(target_price=0)])
+        untouched = self.ArbitrageOpportunity.bulk_create([self.row()])[0]
+        self.db.session.flush()
+
+        updated = self.ArbitrageOpportunity.recompute_bulk([opportunity.id for opportunity in created])
+        self.db.session.commit()
+        self.db.session.expire_all()
+
+        self.assertEqual(updated, 2)
+        self.assertEqual(created[0].profit, 7)
+        self.assertEqual(created[0].profit_margin, 35)
+        self.assertEqual(created[1].profit, -13)
+        self.assertEqual(created[1].profit_margin, 0)
+        self.assertEqual(untouched.profit, 0)
+
+    def test_missing_costs_count_as_zero(self):
+        created = self.ArbitrageOpportunity.bulk_create([self.row(shipping_cost=None, fees=None)])
+
+        self.ArbitrageOpportunity.recompute_bulk([created[0].id])
+        self.db.session.commit()
+        self.db.session.expire_all()
+
+        self.assertEqual(created[0].profit, 10)
+        self.assertEqual(created[0].profit_margin, 50)
+
+    def test_no_ids_is_a_no_op(self):
+        self.assertEqual(self.ArbitrageOpportunity.recompute_bulk([]), 0)
+
+class TestViewOpportunity(OpportunityTestCase):
+    """Only the owner (or an admin) can open an opportunity page."""
+
+    def setUp(self):
+        super().setUp()
+        opportunity = self.ArbitrageOpportunity(**self.row(profit=7, profit_margin=35))
+        self.db.session.add(opportunity)
+        self.db.session.commit()
+        self.url = f'/opportunity/{opportunity.id}'
+        self.client = self.app.test_client()
+
+    def get(self):
+        # The HTML templates belong to the file-backed web UI, so only the
+        # view's choice of opportunity is checked here
+        with patch.object(import_module('main'), 'render_template',
+                          side_effect=lambda name, **context: str(context['opportunity'].id)):
+            return self.client.get(self.url, headers={'Accept': 'application/json'})
+
+    def test_owner_can_view(self):
+        self.login(self.client, self.user)
+
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(as_text=True), self.url.rsplit('/', 1)[1])
+
+    def test_other_users_get_not_found(self):
+        self.login(self.client, self.create_user(email='other@example.com', username='other'))
+
+        self.assertEqual(self.get().status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Tests for keyset (cursor) pagination of the list endpoints.
+"""
+
+import unittest
+
+from helpers import AppTestCase, import_module
+
+class TestKeysetPagination(AppTestCase):
+    """Following ``next_cursor`` must visit every row exactly once."""
+
+    def setUp(self):
+        super().setUp()
+        Notification = import_module('models').Notification
+        self.user = self.create_user()
+        self.client = self.app.test_client()
+        self.login(self.client, self.user)
+        # Inserted back to back, so most rows share the same second
+        self.db.session.add_all([
+            Notification(user_id=self.user.id, title=f'Notification {i}', message='...')
+            for i in range(25)
+        ])
+        self.db.session.commit()
+
+    def walk(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.get_json()['data']
+            pages.append([item['id'] for item in data['items']])
+            self.assertLessEqual(len(pages), 10, 'cursor never reached the end')
+            url = (f"/api/v1/notifications?per_page=10&status=all&cursor={data['next_cursor']}"
+                   if data['has_next'] else None)
+        return pages
+
+    def test_pages_do_not_overlap(self):
+        pages = self.walk('/api/v1/notifications?per_page=10&status=all')
+
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertFalse(set(pages[0]) & set(pages[1]))
+        ids = [row_id for page in pages for row_id in page]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), 25)
+
+    def test_paginate_keyset_second_page(self):
+        utils = import_module('utils')
+        Notification = import_module('models').Notification
+        query = Notification.query.filter_by(user_id=self.user.id)
+
+        first = utils.paginate_keyset(query, Notification.created_at, Notification.id, per_page=10)
+        second = utils.paginate_keyset(query, Notification.created_at, Notification.id,
+                                       cursor=first.next_cursor, per_page=10)
+
+        self.assertTrue(first.has_next)
+        self.assertFalse({n.id for n in first} & {n.id for n in second})
+
+    def test_invalid_cursor_starts_from_the_first_page(self):
+        response = self.client.get('/api/v1/notifications?per_page=10&status=all&cursor=bogus')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['data']['items'][0]['id'], 25)
+
+    def test_first_page_number_is_still_accepted(self):
+        response = self.client.get('/api/v1/notifications?per_page=10&status=all&page=1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()['data']['items']), 10)
+
+    def test_later_page_numbers_are_rejected(self):
+        for url in ('/api/v1/notifications?page=2', '/api/v1/products?page=2',
+                    '/api/v1/opportunities?page=3'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 400, url)
+            self.assertIn('next_cursor', response.get_json()['message'])
+
+if __name__ == '__main__':
+    unittest.main()
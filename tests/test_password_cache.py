@@ -0,0 +1,51 @@
+"""
+Tests for the short-lived password verification cache of the web interface.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from cachetools import TTLCache
+from werkzeug.security import generate_password_hash
+
+from helpers import import_web_app
+
+class TestPasswordCache(unittest.TestCase):
+    """Verification results are reused briefly without keeping plaintext."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.web = import_web_app()
+        cls.hash = generate_password_hash('s3cret-password', method='pbkdf2:sha256:1000')
+
+    def setUp(self):
+        self.web._VERIFY_CACHE.clear()
+
+    def test_result_is_reused(self):
+        self.assertTrue(self.web._verify(self.hash, 's3cret-password'))
+        with patch.object(self.web, 'check_password_hash') as check:
+            self.assertTrue(self.web._verify(self.hash, 's3cret-password'))
+        check.assert_not_called()
+
+    def test_wrong_password_is_rejected(self):
+        self.assertTrue(self.web._verify(self.hash, 's3cret-password'))
+        self.assertFalse(self.web._verify(self.hash, 'wrong-password'))
+
+    def test_plaintext_is_not_kept(self):
+        self.web._verify(self.hash, 's3cret-password')
+        for hash_str, digest in self.web._VERIFY_CACHE.keys():
+            self.assertNotIn(b's3cret-password', digest)
+            self.assertNotEqual(digest, 's3cret-password')
+
+    def test_entries_expire_after_a_minute(self):
+        now = [0.0]
+        cache = TTLCache(maxsize=16, ttl=self.web._VERIFY_CACHE.ttl, timer=lambda: now[0])
+        with patch.object(self.web, '_VERIFY_CACHE', cache):
+            self.web._verify(self.hash, 's3cret-password')
+            now[0] = 61.0
+            with patch.object(self.web, 'check_password_hash', return_value=True) as check:
+                self.web._verify(self.hash, 's3cret-password')
+        check.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
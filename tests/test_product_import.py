@@ -0,0 +1,80 @@
+"""
+Tests for the admin CSV product import.
+"""
+
+import io
+import unittest
+from unittest.mock import patch
+
+from helpers import AppTestCase, import_module
+
+class TestProductImport(AppTestCase):
+    """Imports write products in batches and record their prices."""
+
+    def setUp(self):
+        super().setUp()
+        models = import_module('models')
+        self.Product = models.Product
+        self.ProductPriceHistory = models.ProductPriceHistory
+        self.marketplace = models.Marketplace(name='Amazon', code='amazon')
+        self.admin = self.create_user(email='admin@example.com', username='admin')
+        self.admin.roles.append(models.Role(name='admin'))
+        self.db.session.add(self.marketplace)
+        self.db.session.commit()
+        self.client = self.app.test_client()
+        self.login(self.client, self.admin)
+
+    def upload(self, lines, update_existing=True):
+        data = {
+            'marketplace_id': str(self.marketplace.id),
+            'import_file': (io.BytesIO('\n'.join(lines).encode()), 'products.csv'),
+        }
+        if update_existing:
+            data['update_existing'] = 'y'
+        response = self.client.post('/admin/import-products', data=data,
+                                    content_type='multipart/form-data')
+        self.assertEqual(response.status_code, 302)
+        self.db.session.expire_all()
+
+    def prices(self, product):
+        return [row.price for row in self.ProductPriceHistory.query
+                .filter_by(product_id=product.id).order_by(self.ProductPriceHistory.id)]
+
+    def test_new_products_are_inserted_with_prices(self):
+        admin = import_module('admin')
+        with patch.object(admin, 'IMPORT_BATCH_SIZE', 2):
+            self.upload([
+                'id,name,price,url,brand',
+                'A1,Widget,9.99,https://example.com/a1,Acme',
+                'A2,Gadget,19.50,https://example.com/a2,',
+                'A3,Gizmo,5,https://example.com/a3,Acme',
+            ])
+
+        products = {p.external_id: p for p in self.Product.query}
+        self.assertEqual(sorted(products), ['A1', 'A2', 'A3'])
+        self.assertEqual(products['A1'].brand, 'Acme')
+        self.assertEqual(products['A2'].url, 'https://example.com/a2')
+        self.assertEqual(products['A3'].marketplace_id, self.marketplace.id)
+        self.assertEqual(self.prices(products['A1']), [9.99])
+        self.assertEqual(self.prices(products['A3']), [5.0])
+
+    def test_existing_products_are_updated(self):
+        self.upload(['id,name,price,url', 'A1,Widget,9.99,https://example.com/a1'])
+        self.upload(['id,name,price,url', 'A1,Widget v2,8.49,https://example.com/a1-v2'])
+
+        product = self.Product.query.one()
+        self.assertEqual(product.name, 'Widget v2')
+        self.assertEqual(product.url, 'https://example.com/a1-v2')
+        self.assertEqual(self.prices(product), [9.99, 8.49])
+
+    def test_existing_products_are_kept_without_update_existing(self):
+        self.upload(['id,name,price,url', 'A1,Widget,9.99,https://example.com/a1'])
+        self.upload(['id,name,price,url', 'A1,Widget v2,8.49,https://example.com/a1'],
+                    update_existing=False)
+
+        product = self.Product.query.one()
+        self.assertEqual(product.name, 'Widget')
+        self.assertEqual(self.prices(product), [9.99])
+
+if __name__ == '__main__':
+    unittest.main()
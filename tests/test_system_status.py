@@ -0,0 +1,37 @@
+"""
+Tests for the CPU sampler behind the admin system status page.
+"""
+
+import unittest
+from unittest.mock import patch
+
+from helpers import AppTestCase, import_module
+
+class TestCPUSampler(AppTestCase):
+    """The sampler starts on first use, once per process."""
+
+    def setUp(self):
+        super().setUp()
+        import_module('extensions').cache.clear()
+        self.admin = import_module('admin')
+        patcher = patch.object(self.admin, '_cpu_sampler_pid', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_started_once_on_first_use(self):
+        with patch.object(self.admin.threading, 'Thread') as thread:
+            self.admin._system_info()
+            self.admin.start_cpu_sampler()
+
+        thread.return_value.start.assert_called_once_with()
+
+    def test_restarted_in_a_forked_process(self):
+        with patch.object(self.admin.threading, 'Thread') as thread:
+            self.admin.start_cpu_sampler()
+            with patch.object(self.admin.os, 'getpid', return_value=-1):
+                self.admin.start_cpu_sampler()
+
+        self.assertEqual(thread.return_value.start.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
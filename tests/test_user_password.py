@@ -0,0 +1,43 @@
+"""
+Tests for password hashing on the user model.
+"""
+
+import unittest
+
+from werkzeug.security import generate_password_hash
+
+from helpers import AppTestCase
+
+class TestPasswordHashing(AppTestCase):
+    """New hashes are argon2id; werkzeug hashes are upgraded on a good login."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user(password='s3cret-password')
+
+    def test_new_passwords_use_argon2id(self):
+        self.assertTrue(self.user.password_hash.startswith('$argon2id$'))
+        self.assertTrue(self.user.verify_password('s3cret-password'))
+        self.assertFalse(self.user.verify_password('wrong-password'))
+
+    def test_legacy_hash_is_upgraded_on_login(self):
+        self.user.password_hash = generate_password_hash('s3cret-password', method='pbkdf2:sha256:1000')
+        self.db.session.commit()
+
+        self.assertTrue(self.user.verify_password('s3cret-password'))
+        self.db.session.commit()
+        self.db.session.expire(self.user)
+
+        self.assertTrue(self.user.password_hash.startswith('$argon2id$'))
+        self.assertTrue(self.user.verify_password('s3cret-password'))
+
+    def test_legacy_hash_is_kept_on_wrong_password(self):
+        legacy = generate_password_hash('s3cret-password', method='pbkdf2:sha256:1000')
+        self.user.password_hash = legacy
+        self.db.session.commit()
+
+        self.assertFalse(self.user.verify_password('wrong-password'))
+        self.assertEqual(self.user.password_hash, legacy)
+
+if __name__ == '__main__':
+    unittest.main()
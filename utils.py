@@ -1,20 +1,55 @@
 """Utility functions for the Super Arbitrage application."""
 import os
 import logging
+import queue
+import threading
 from functools import wraps
 from flask import current_app, request, jsonify, redirect, url_for, flash
+from flask.json.provider import DefaultJSONProvider
 from flask_login import current_user
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import event, literal, tuple_
+from sqlalchemy.orm import Session, raiseload
+import base64
 import jwt
+import orjson
 import json
 import requests
 from urllib.parse import urljoin
+from .extensions import cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson for faster ``jsonify`` responses.
+    
+    Dates still go through Flask's ``default`` hook so responses keep the
+    same HTTP-date format as the stdlib provider.
+    """
+    
+    def _option(self, indent=False):
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._option()).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._option(indent))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
 def admin_required(f):
     """Decorator to require admin privileges."""
     @wraps(f)
@@ -27,19 +62,78 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def list_loader_options(*options):
+    """Loader options for queries whose rows are serialized in bulk.
+    
+    Under TESTING any relationship not explicitly eager-loaded raises on
+    access, so an N+1 introduced in ``to_dict()`` fails the test suite
+    instead of silently slowing down production.
+    """
+    if current_app.config.get('TESTING'):
+        options += (raiseload('*'),)
+    return options
+
+def call_after_commit(session, callback):
+    """Run ``callback`` once ``session``'s transaction has committed.
+    
+    For cache invalidation: mapper events fire at flush, when other requests
+    cannot see the change yet and could re-cache the old state; a rollback
+    discards the callback instead.
+    """
+    session.info.setdefault('after_commit', []).append(callback)
+
+@event.listens_for(Session, 'after_commit')
+def _run_after_commit(session):
+    for callback in session.info.pop('after_commit', ()):
+        callback()
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_commit(session):
+    session.info.pop('after_commit', None)
+
+def get_redis():
+    """Shared Redis client for ``REDIS_URL``, or None when it isn't configured."""
+    url = current_app.config.get('REDIS_URL')
+    if not url:
+        return None
+    client = current_app.extensions.get('redis')
+    if client is None:
+        import redis
+        client = current_app.extensions['redis'] = redis.Redis.from_url(url)
+    return client
+
 def log_activity(action, details, user_id=None, ip_address=None, user_agent=None):
-    """Log user activity to the database."""
+    """Log user activity.
+    
+    With Redis configured the entry is appended to the activity log stream
+    (see ``ActivityLog.flush_stream``); otherwise, or if Redis is down, it is
+    inserted directly.
+    """
     from .models import ActivityLog, db
     
+    entry = {
+        'user_id': user_id or (current_user.id if current_user.is_authenticated else None),
+        'action': action,
+        'details': details,
+        'ip_address': ip_address or request.remote_addr if request else None,
+        'user_agent': user_agent or (request.user_agent.string if request else None),
+        'created_at': datetime.now(timezone.utc).isoformat()
+    }
+    
+    redis_conn = get_redis()
+    if redis_conn is not None:
+        try:
+            redis_conn.xadd(current_app.config['ACTIVITY_LOG_STREAM'],
+                            {'entry': orjson.dumps(entry, default=str)},
+                            maxlen=current_app.config['ACTIVITY_LOG_STREAM_MAXLEN'],
+                            approximate=True)
+            return
+        except Exception as e:
+            logger.warning(f"Activity log stream unavailable, writing directly: {str(e)}")
+    
     try:
-        log = ActivityLog(
-            user_id=user_id or (current_user.id if current_user.is_authenticated else None),
-            action=action,
-            details=details,
-            ip_address=ip_address or request.remote_addr if request else None,
-            user_agent=user_agent or (request.user_agent.string if request else None)
-        )
-        db.session.add(log)
+        entry['created_at'] = datetime.fromisoformat(entry['created_at'])
+        db.session.add(ActivityLog(**entry))
         db.session.commit()
     except Exception as e:
         logger.error(f"Failed to log activity: {str(e)}")
@@ -83,6 +177,43 @@ def send_email(subject, recipients, text_body, html_body=None, sender=None):
     # Fallback to console output
     logger.info(f"Email would be sent to {recipients} with subject: {subject}")
 
+# Outgoing mail is handed to a single daemon thread so requests don't wait on SMTP
+_email_queue = queue.Queue()
+_email_worker = None
+_email_worker_lock = threading.Lock()
+
+def _email_worker_loop():
+    while True:
+        app, args = _email_queue.get()
+        try:
+            with app.app_context():
+                send_email(*args)
+        except Exception as e:
+            logger.error(f"Failed to send email: {str(e)}")
+        finally:
+            _email_queue.task_done()
+
+def send_email_async(subject, recipients, text_body, html_body=None, sender=None):
+    """Queue an email for background delivery.
+    
+    Bodies must already be rendered; the worker only has an app context.
+    """
+    global _email_worker
+    with _email_worker_lock:
+        if _email_worker is None:
+            _email_worker = threading.Thread(target=_email_worker_loop, name='email-sender', daemon=True)
+            _email_worker.start()
+    _email_queue.put((current_app._get_current_object(),
+                      (subject, recipients, text_body, html_body, sender)))
+
+@cache.memoize(timeout=60)
+def get_marketplace_choices():
+    """``(id, name)`` pairs for marketplace select fields, ordered by name."""
+    from .models import Marketplace, db
+    # Plain (id, name) rows; no need to build full Marketplace objects
+    rows = db.session.query(Marketplace.id, Marketplace.name).order_by(Marketplace.name).all()
+    return [tuple(row) for row in rows]
+
 def generate_api_key(user_id, expires_in=3600):
     """Generate a JWT token for API authentication."""
     payload = {
@@ -244,3 +375,65 @@ def get_pagination_info(pagination, endpoint, **kwargs):
             'next': url_for(endpoint, page=pagination.next_num, **kwargs, _external=True) if pagination.has_next else None
         }
     }
+
+
+class KeysetPagination:
+    """A page of results fetched with keyset (seek) pagination.
+    
+    Unlike Flask-SQLAlchemy's ``paginate()``, this never issues a ``COUNT(*)``
+    and never uses ``OFFSET``; it only knows whether a following page exists.
+    """
+    
+    def __init__(self, items, per_page, next_cursor=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+    
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+    
+    def __iter__(self):
+        return iter(self.items)
+
+def encode_cursor(sort_value, row_id):
+    """Encode a ``(sort_value, id)`` pair as an opaque URL-safe cursor."""
+    raw = f"{sort_value.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by ``encode_cursor``; returns None if invalid."""
+    if not cursor:
+        return None
+    try:
+        sort_value, row_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, UnicodeError):
+        return None
+
+def paginate_keyset(query, sort_column, id_column, cursor=None, per_page=20):
+    """Paginate a query newest-first on ``(sort_column, id_column)``.
+    
+    Fetches ``per_page + 1`` rows to detect a following page, so no separate
+    count query is needed and deep pages cost an index seek, not a scan.
+    """
+    position = decode_cursor(cursor)
+    if position is not None:
+        # Bind with the columns' own types so the cursor is rendered exactly
+        # like the stored values (SQLite compares datetimes as strings)
+        sort_value, row_id = position
+        query = query.filter(tuple_(sort_column, id_column) <
+                             tuple_(literal(sort_value, sort_column.type),
+                                    literal(row_id, id_column.type)))
+    
+    rows = (query.order_by(sort_column.desc(), id_column.desc())
+                 .limit(per_page + 1)
+                 .all())
+    
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    
+    return KeysetPagination(rows, per_page, next_cursor)